@@ -0,0 +1,166 @@
+import os
+import numpy as np
+
+
+class AmoScanner:
+    """incremental scanner of AMOLQC output files.
+
+    All sections of an .amo file are extracted in one forward pass over
+    its lines: the status of the run, the energy contributions of the csfs
+    of "Index  Energy difference" or $nrgs blocks and the names of wave
+    function files. The reached byte offset of each file is cached, such
+    that repeated scans only read the bytes appended in the meantime. Only
+    complete lines are scanned, the last line of a file that is still
+    written is scanned once it is terminated by a line break."""
+
+    def __init__(self, open_file=open):
+        # function to open files for binary reading, e.g. with decompression
+        self.open_file = open_file
+        self.finish_marker = "Amolqc run finished"
+        # number of bytes at the end of the file that are checked first
+        self.tail_size = 4096
+        # bytes in front of the cached offset that have to be unchanged
+        self.check_size = 64
+        # number of bytes read at once
+        self.block_size = 2**24
+        self.states = {}
+        # offsets up to which files are searched for the finish marker
+        self.marker_offsets = {}
+
+    def new_state(self):
+        """state of a file that has not been scanned"""
+        return {
+            "stat": None,
+            "offset": 0,
+            "check": b"",
+            "in_block": False,
+            "indices": [],
+            "energies": [],
+            "wavefunctions": [],
+            "finished": False,
+        }
+
+    def scan_lines(self, state, lines, max_rows=-1):
+        """update state by lines of the file. With max_rows >= 0 the scan
+        stops once max_rows energies are parsed. Returns the number of
+        scanned lines."""
+        indices = state["indices"]
+        energies = state["energies"]
+        for n_lines, line in enumerate(lines):
+            if 0 <= max_rows <= len(indices):
+                return n_lines
+            if state["in_block"] and "$end" in line:
+                state["in_block"] = False
+            if state["in_block"]:
+                # lines of energies do not contain other sections, lines
+                # that are not index and energy are skipped
+                items = line.split()
+                try:
+                    index = int(items[0])
+                    energy = float(items[1])
+                except (IndexError, ValueError):
+                    continue
+                indices.append(index)
+                energies.append(energy)
+                continue
+            if "Index  Energy difference" in line or "$nrgs" in line:
+                state["in_block"] = True
+            if self.finish_marker in line:
+                state["finished"] = True
+            if ".wf" in line:
+                for item in line.split():
+                    name = item.strip("\"',:;()")
+                    if name.endswith(".wf"):
+                        if name not in state["wavefunctions"]:
+                            state["wavefunctions"].append(name)
+        return len(lines)
+
+    def scan(self, filename, max_rows=-1):
+        """scan bytes of file that were appended since the last scan. With
+        max_rows >= 0 reading stops once max_rows energies are parsed.
+        Returns dictionary with status finished or running, indices and
+        energies of csfs and names of wave function files."""
+        stat = os.stat(filename)
+        stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        state = self.states.get(filename, self.new_state())
+        if state["stat"] != stat and not (
+            0 <= max_rows <= len(state["indices"])
+        ):
+            with self.open_file(filename, "rb") as f:
+                start = max(0, state["offset"] - len(state["check"]))
+                f.seek(start)
+                if f.read(state["offset"] - start) != state["check"]:
+                    # file has been replaced, scan from beginning
+                    state = self.new_state()
+                    f.seek(0)
+                rest = b""
+                while True:
+                    block = f.read(self.block_size)
+                    if not block:
+                        # all complete lines are scanned
+                        state["stat"] = stat
+                        break
+                    text = rest + block
+                    # the last incomplete line is scanned with the next
+                    # bytes
+                    ends = np.flatnonzero(
+                        np.frombuffer(text, dtype=np.uint8) == ord("\n")
+                    )
+                    lines = text[: ends[-1] + 1] if len(ends) else b""
+                    lines = lines.decode("utf-8", "replace").split("\n")[:-1]
+                    n_lines = self.scan_lines(state, lines, max_rows)
+                    # scan stopped in front of line n_lines
+                    complete = ends[n_lines - 1] + 1 if n_lines else 0
+                    state["offset"] += complete
+                    check = text[max(0, complete - self.check_size) : complete]
+                    state["check"] = (state["check"] + check)[
+                        -self.check_size :
+                    ]
+                    rest = text[complete:]
+                    if n_lines < len(lines):
+                        break
+            self.states[filename] = state
+        return {
+            "status": "finished" if state["finished"] else "running",
+            "indices": list(state["indices"]),
+            "energies": list(state["energies"]),
+            "wavefunctions": list(state["wavefunctions"]),
+        }
+
+    def is_finished(self, filename):
+        """check if AMOLQC run of output file is finished without parsing
+        energies. The end of the file is checked first, otherwise the bytes
+        appended since the last check are searched for the finish
+        marker."""
+        marker = self.finish_marker.encode()
+        with self.open_file(filename, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - self.tail_size))
+            if marker in f.read():
+                return True
+            offset = self.marker_offsets.get(filename, 0)
+            if offset > size:
+                # file has been replaced, search from beginning
+                offset = 0
+            # overlap blocks such that markers across blocks are found
+            f.seek(max(0, offset - len(marker) + 1))
+            text = b""
+            while True:
+                block = f.read(self.block_size)
+                if not block:
+                    break
+                text = text[-len(marker) + 1 :] + block
+                if marker in text:
+                    return True
+        self.marker_offsets[filename] = size
+        return False
+
+    def get_energies(self, filename, max_rows=-1):
+        """indices and energies of csfs in order of the file. With max_rows
+        >= 0 at most max_rows energies are returned and the file is only
+        read until they are found."""
+        result = self.scan(filename, max_rows)
+        if max_rows >= 0:
+            return result["indices"][:max_rows], result["energies"][:max_rows]
+        return result["indices"], result["energies"]
@@ -1,8 +1,10 @@
+import os
 import time
 import math
 import numpy as np
 from pyscript import *  # requirement pyscript as python package https://github.com/Leonard-Reuter/pyscript
 from csf import SelectedCI
+from amoscanner import AmoScanner
 
 
 class Automation:
@@ -30,8 +32,19 @@ class Automation:
         threshold_type,
         keep_all_singles,
         max_csfs,
+        workers=1,
+        spin_coupling_cache="",
+        configuration_space=False,
+        internal_format="text",
+        internal_compression="",
+        state_symmetry="",
     ):
         self.sCI = SelectedCI()
+        self.sCI.internal_format = internal_format
+        self.sCI.internal_compression = internal_compression
+        self.sCI.state_symmetry = state_symmetry
+        if spin_coupling_cache:
+            self.sCI.spinfuncs.load_cache(spin_coupling_cache)
         self.wavefunction_name = wavefunction_name
         self.N = N
         self.S = S
@@ -55,6 +68,10 @@ class Automation:
         self.keep_all_singles = keep_all_singles
         self.n_all_csfs = 0
         self.max_csfs = max_csfs
+        self.workers = workers
+        self.configuration_space = configuration_space
+        # scanned AMOLQC output files
+        self.amo_scanner = AmoScanner()
 
     def print_job_file(
         self,
@@ -79,16 +96,15 @@ mpiexec -np {n_tasks} {path} {ami_name}.ami
             )
 
     def check_job_done(self, amo_name, verbose=True):
+        # the end of the output is checked first and only new output is
+        # scanned in repeated checks
         job_done = False
         try:
-            with open(f"{amo_name}.amo", "r") as reffile:
-                for line in reffile:
-                    if "Amolqc run finished" in line:
-                        job_done = True
-                        if verbose:
-                            print("job done.")
+            job_done = self.amo_scanner.is_finished(f"{amo_name}.amo")
         except FileNotFoundError:
             pass
+        if job_done and verbose:
+            print("job done.")
         return job_done
 
     def get_final_wavefunction(self, ami_name):
@@ -106,22 +122,16 @@ mpiexec -np {n_tasks} {path} {ami_name}.ami
 
     def get_n_all_csfs(self, input_wf):
         """"""
+        # only the headers of the files are read
         n_csfs = 0
-        _, csfs, _, _ = self.sCI.read_AMOLQC_csfs(f"{input_wf}.wf", self.N)
-        n_csfs += len(csfs)
+        n_csfs += len(self.sCI.open_AMOLQC(f"{input_wf}.wf", self.N))
         try:
-            _, csfs_res, _, _ = self.sCI.read_AMOLQC_csfs(
-                f"{input_wf}_res.wf", self.N
-            )
-            n_csfs += len(csfs_res)
+            n_csfs += len(self.sCI.open_AMOLQC(f"{input_wf}_res.wf", self.N))
         except FileNotFoundError:
             if self.verbose:
                 print(f"{input_wf}_res.wf not found.")
         try:
-            _, csfs_dis, _, _ = self.sCI.read_AMOLQC_csfs(
-                f"{input_wf}_dis.wf", self.N
-            )
-            n_csfs += len(csfs_dis)
+            n_csfs += len(self.sCI.open_AMOLQC(f"{input_wf}_dis.wf", self.N))
         except FileNotFoundError:
             print(f"{input_wf}_dis.wf not found.")
         return n_csfs
@@ -148,6 +158,8 @@ mpiexec -np {n_tasks} {path} {ami_name}.ami
                 self.wavefunction_name,
                 split_at=self.blocksize,
                 sort_option=self.sort_option,
+                configuration_space=self.configuration_space,
+                workers=self.workers,
                 verbose=self.verbose,
             )
             # extract total number of csfs
@@ -455,37 +467,33 @@ blockwise opimization is finished."
             elif self.criterion == "ci_coefficient":
                 ref_list = CI_coefficients
                 absol = True
-                # sort csfs by criterion
-            (
-                csf_coefficients[idx:],
-                csfs[idx:],
-                CI_coefficients[idx:],
-                energies[idx:],
-            ) = self.sCI.sort_lists_by_list(
+            # sort csfs behind the kept single excitations by criterion.
+            # The csfs are written in this order without sorting the lists.
+            order = list(range(idx))
+            if len(ref_list):
+                order = self.sCI.get_partial_sort_order(
+                    ref_list, idx, side=-1, absol=absol
+                ).tolist()
+            #
+            self.sCI.write_AMOLQC_partitioned(
+                csf_coefficients,
+                csfs,
+                CI_coefficients,
                 [
-                    csf_coefficients[idx:],
-                    csfs[idx:],
-                    CI_coefficients[idx:],
-                    energies[idx:],
+                    f"{self.wavefunction_name}.wf",
+                    f"{self.wavefunction_name}_dis.wf",
+                ],
+                split_at=[self.blocksize],
+                order=order,
+                energies=energies,
+                energy_files=[1],
+                options=[
+                    {"pretext": wfpretext},
+                    {
+                        "binary": self.sCI.internal_format == "binary",
+                        "compression": self.sCI.internal_compression,
+                    },
                 ],
-                ref_list,
-                side=-1,
-                absol=absol,
-            )
-            #
-            self.sCI.write_AMOLQC(
-                csf_coefficients[: self.blocksize],
-                csfs[: self.blocksize],
-                CI_coefficients[: self.blocksize],
-                pretext=wfpretext,
-                file_name=f"{self.wavefunction_name}.wf",
-            )
-            self.sCI.write_AMOLQC(
-                csf_coefficients[self.blocksize :],
-                csfs[self.blocksize :],
-                CI_coefficients[self.blocksize :],
-                energies=energies[self.blocksize :],
-                file_name=f"{self.wavefunction_name}_dis.wf",
             )
 
             cp(f"../{final_ami}.ami", ".")
@@ -742,6 +750,8 @@ blockwise opimization is finished."
                 self.frozen_MOs,
                 self.wavefunction_name,
                 sort_option=self.sort_option,
+                configuration_space=self.configuration_space,
+                workers=self.workers,
                 verbose=self.verbose,
             )
             # extract total number of csfs
@@ -804,6 +814,8 @@ blockwise opimization is finished."
                     mv(f"../{last_wavefunction}_dis.wf", ".")
                 except FileNotFoundError:
                     pass
+                if os.path.isfile(f"../{last_wavefunction}_dis_visited.npz"):
+                    mv(f"../{last_wavefunction}_dis_visited.npz", ".")
                 try:
                     mv(f"../{last_wavefunction}_nrg.amo", ".")
                 except FileNotFoundError:
@@ -827,6 +839,7 @@ blockwise opimization is finished."
                     self.threshold,
                     self.max_csfs,
                     threshold_type=self.threshold_type,
+                    workers=self.workers,
                     verbose=self.verbose,
                 )
                 mv(
@@ -837,6 +850,11 @@ blockwise opimization is finished."
                     f"{last_wavefunction}_dis_out.wf",
                     f"{self.wavefunction_name}_dis.wf",
                 )
+                if os.path.isfile(f"{last_wavefunction}_dis_out_visited.npz"):
+                    mv(
+                        f"{last_wavefunction}_dis_out_visited.npz",
+                        f"{self.wavefunction_name}_dis_visited.npz",
+                    )
                 cp(f"../{iteration_ami}.ami", ".")
                 # submit job
                 self.print_job_file(
@@ -895,6 +913,11 @@ blockwise opimization is finished."
                     f"{self.wavefunction_name}_dis.wf",
                     f"../{dir_name}_dis.wf",
                 )
+                if os.path.isfile(f"{self.wavefunction_name}_dis_visited.npz"):
+                    cp(
+                        f"{self.wavefunction_name}_dis_visited.npz",
+                        f"../{dir_name}_dis_visited.npz",
+                    )
                 last_wavefunction = dir_name
                 excitations_on = [i + 1 for i in excitations_on]
 
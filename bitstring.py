@@ -0,0 +1,177 @@
+import numpy as np
+
+
+class Bitstring:
+    """packed alpha/beta bitstring representation of determinants.
+
+    A determinant in the signed-int representation (alpha electrons positive,
+    beta electrons negative, orbitals counted from 1) is stored as a pair of
+    integers (alpha, beta), where bit k is set if orbital k+1 is occupied.
+    For arrays of determinants the bitstrings are split into uint64 words,
+    such that more than 64 MOs are stored as multi-word arrays."""
+
+    def __init__(self):
+        self.word_size = 64
+        self.word_mask = (1 << self.word_size) - 1
+
+    def n_words(self, n_orbitals):
+        """number of uint64 words that are required to store n_orbitals"""
+        return max(1, -(-n_orbitals // self.word_size))
+
+    def det2bits(self, determinant):
+        """convert signed-int determinant in (alpha, beta) bitstrings"""
+        alpha = 0
+        beta = 0
+        for electron in determinant:
+            if electron > 0:
+                alpha |= 1 << (electron - 1)
+            else:
+                beta |= 1 << (-electron - 1)
+        return alpha, beta
+
+    def bits2orbitals(self, bits):
+        """return occupied orbitals (counted from 1) of bitstring in
+        ascending order"""
+        orbitals = []
+        while bits:
+            lowest = bits & -bits
+            orbitals.append(lowest.bit_length())
+            bits ^= lowest
+        return orbitals
+
+    def bits2det(self, alpha, beta, order="custom"):
+        """convert (alpha, beta) bitstrings in signed-int determinant.
+
+        order "custom" sorts by orbital and alpha before beta, which
+        corresponds to SelectedCI.custom_sort, order "amolqc" returns
+        alpha spins first and then beta spins in ascending order."""
+        alpha_orbitals = self.bits2orbitals(alpha)
+        beta_orbitals = self.bits2orbitals(beta)
+        if order == "amolqc":
+            return alpha_orbitals + [-orbital for orbital in beta_orbitals]
+        assert order == "custom", "order has to be custom or amolqc."
+        det = []
+        for orbital in self.bits2orbitals(alpha | beta):
+            if alpha >> (orbital - 1) & 1:
+                det.append(orbital)
+            if beta >> (orbital - 1) & 1:
+                det.append(-orbital)
+        return det
+
+    def det2config(self, determinant):
+        """return spatial configuration of determinant as bitstrings of
+        doubly and singly occupied orbitals"""
+        alpha, beta = self.det2bits(determinant)
+        return alpha & beta, alpha ^ beta
+
+    def remove_duplicates(self, determinants):
+        """remove duplicate determinants from list. Keeps the first
+        occurrence and the order of the input list."""
+        res = []
+        seen = set()
+        for det in determinants:
+            bits = self.det2bits(det)
+            if bits not in seen:
+                res.append(det)
+                seen.add(bits)
+        return res
+
+    def int2words(self, bits, n_words):
+        """split integer bitstring in list of uint64 words"""
+        return [
+            (bits >> (self.word_size * w)) & self.word_mask
+            for w in range(n_words)
+        ]
+
+    def words2int(self, words):
+        """join uint64 words to integer bitstring"""
+        bits = 0
+        for w, word in enumerate(words):
+            bits |= int(word) << (self.word_size * w)
+        return bits
+
+    def dets2array(self, determinants, n_orbitals=0):
+        """convert list of signed-int determinants in uint64 array of
+        shape (n_dets, 2, n_words) with alpha and beta bitstrings"""
+        if not n_orbitals:
+            n_orbitals = max(
+                (abs(e) for det in determinants for e in det), default=1
+            )
+        n_words = self.n_words(n_orbitals)
+        lengths = {len(det) for det in determinants}
+        if len(lengths) == 1:
+            # all determinants have same number of electrons
+            return self.orbitals2array(np.array(determinants), n_words)
+        res = np.zeros((len(determinants), 2, n_words), dtype=np.uint64)
+        for i, det in enumerate(determinants):
+            alpha, beta = self.det2bits(det)
+            res[i, 0] = self.int2words(alpha, n_words)
+            res[i, 1] = self.int2words(beta, n_words)
+        return res
+
+    def orbitals2array(self, orbitals, n_words):
+        """convert integer array of shape (n_dets, n_elec) with signed
+        orbitals in uint64 array of shape (n_dets, 2, n_words)"""
+        orbitals = np.asarray(orbitals, dtype=np.int64)
+        res = np.zeros((orbitals.shape[0], 2, n_words), dtype=np.uint64)
+        idx = np.abs(orbitals) - 1
+        word = idx // self.word_size
+        bit = np.left_shift(
+            np.uint64(1), (idx % self.word_size).astype(np.uint64)
+        )
+        for w in range(n_words):
+            in_word = word == w
+            for spin, is_spin in enumerate((orbitals > 0, orbitals < 0)):
+                res[:, spin, w] = np.bitwise_or.reduce(
+                    np.where(in_word & is_spin, bit, np.uint64(0)), axis=1
+                )
+        return res
+
+    def pairs2array(self, pairs, n_words):
+        """convert list of bitstring pairs, e.g. (alpha, beta) of
+        determinants or (doubly, singly) of configurations, in uint64 array
+        of shape (n_pairs, 2, n_words)"""
+        res = np.zeros((len(pairs), 2, n_words), dtype=np.uint64)
+        for i, (first, second) in enumerate(pairs):
+            res[i, 0] = self.int2words(first, n_words)
+            res[i, 1] = self.int2words(second, n_words)
+        return res
+
+    def array2pairs(self, array):
+        """convert uint64 array of shape (n_pairs, 2, n_words) in list of
+        bitstring pairs"""
+        return [
+            (self.words2int(first), self.words2int(second))
+            for first, second in array.tolist()
+        ]
+
+    def popcount(self, array):
+        """number of set bits of each element in uint64 array"""
+        if hasattr(np, "bitwise_count"):
+            return np.bitwise_count(array)
+        # count bits bytewise for older numpy versions
+        table = np.array([bin(i).count("1") for i in range(256)], np.uint8)
+        array = np.ascontiguousarray(array, dtype=np.uint64)
+        counts = table[array.view(np.uint8)].reshape(array.shape + (8,))
+        return counts.sum(axis=-1, dtype=np.uint8)
+
+    def excitation_degrees(self, array, reference):
+        """number of electrons in each determinant of the bitstring array
+        of shape (n_dets, 2, n_words) that are not in reference bitstrings
+        of shape (2, n_words)"""
+        reference = np.asarray(reference, dtype=np.uint64)
+        assert (
+            array.shape[1:] == reference.shape
+        ), "determinants and reference have different number of words."
+        differences = self.popcount(array & ~reference[None, :, :])
+        return differences.sum(axis=(1, 2), dtype=np.int64)
+
+    def array2dets(self, array, order="custom"):
+        """convert uint64 array of shape (n_dets, 2, n_words) in list of
+        signed-int determinants"""
+        return [
+            self.bits2det(
+                self.words2int(alpha), self.words2int(beta), order=order
+            )
+            for alpha, beta in array
+        ]
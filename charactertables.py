@@ -1,3 +1,7 @@
+import itertools
+import numpy as np
+
+
 class CharacterTable:
     def __init__(self, point_group: str):
         """"""
@@ -8,7 +12,11 @@ class CharacterTable:
         self.quadratic_funcs = {}
         self.cubic_funcs = {}
         self.order = 0
+        self.irrep_codes = {}
+        self.product_table = {}
+        self.product_masks = None
         self.init_table()
+        self.init_irrep_codes()
 
     def init_table(self):
         """load the desired character table"""
@@ -23,6 +31,47 @@ class CharacterTable:
         if self.point_group == "cs":
             self.cs()
 
+    def init_irrep_codes(self):
+        """encode one-dimensional irreps as integers, such that the direct
+        product of two of them is the bitwise xor of their codes. These are
+        all irreps of abelian point groups. Bit k of the code is set if the
+        character of the k-th generating operation is -1."""
+        characters = {
+            label: charac
+            for label, charac in self.characters.items()
+            if charac[0] == 1
+        }
+        labels = list(characters.keys())
+        n_bits = (len(labels) - 1).bit_length()
+        for generators in itertools.combinations(
+            range(len(self.operations)), n_bits
+        ):
+            codes = {
+                label: sum(
+                    (charac[op] == -1) << k for k, op in enumerate(generators)
+                )
+                for label, charac in characters.items()
+            }
+            if len(set(codes.values())) == len(labels):
+                self.irrep_codes = codes
+                return
+
+    def has_irrep_codes(self, labels: list):
+        """check if all irreps in labels are one-dimensional and xor
+        encoded"""
+        return all(label in self.irrep_codes for label in labels)
+
+    def irrep2int(self, label: str):
+        """return xor code of one-dimensional irrep"""
+        return self.irrep_codes[label]
+
+    def int2irrep(self, code: int):
+        """return mulliken label of xor code of one-dimensional irrep"""
+        for label, label_code in self.irrep_codes.items():
+            if label_code == code:
+                return label
+        return None
+
     def multiply(self, characters_1, characters_2):
         """elementwise character multiplication of two irreps"""
         assert len(characters_1) == len(
@@ -31,6 +80,13 @@ class CharacterTable:
         res = [i * j for i, j in zip(characters_1, characters_2)]
         return res
 
+    def totally_symmetric(self):
+        """return mulliken label of totally symmetric irrep"""
+        for label, charac in self.characters.items():
+            if all(char == 1 for char in charac):
+                return label
+        return None
+
     def get_reduction(self, representation: list):
         """"""
         g = [int(i.split(" ")[0]) for i in self.operations]
@@ -51,6 +107,54 @@ class CharacterTable:
             contributions.append(contribution)
         return contributions, list(self.characters.keys())
 
+    def get_product_table(self):
+        """return direct product table of all pairs of irreps. Each entry
+        holds the mulliken labels of the irreps contained in the reduction
+        of the direct product. The table is built only once."""
+        if not self.product_table:
+            for label_1, charac_1 in self.characters.items():
+                for label_2, charac_2 in self.characters.items():
+                    contributions, labels = self.get_reduction(
+                        self.multiply(charac_1, charac_2)
+                    )
+                    self.product_table[(label_1, label_2)] = [
+                        label
+                        for label, contribution in zip(labels, contributions)
+                        if round(contribution) > 0
+                    ]
+        return self.product_table
+
+    def get_product_masks(self):
+        """return lookup table for direct products of reducible
+        representations. A set of irreps is encoded as bitmask over the
+        irreps in order of the character table. Entry [g, mask] holds the
+        bitmask of all irreps contained in the direct product of the irreps
+        in mask with irrep g."""
+        if self.product_masks is None:
+            labels = list(self.characters.keys())
+            table = self.get_product_table()
+            n_irreps = len(labels)
+            masks = np.zeros((n_irreps, 2**n_irreps), dtype=np.int64)
+            for g, label_g in enumerate(labels):
+                for s, label_s in enumerate(labels):
+                    product = sum(
+                        1 << labels.index(label)
+                        for label in table[(label_s, label_g)]
+                    )
+                    # every set containing irrep s contains its product
+                    contains_s = (np.arange(2**n_irreps) >> s) & 1 == 1
+                    masks[g, contains_s] |= product
+            self.product_masks = masks
+        return self.product_masks
+
+    def mask2labels(self, mask: int):
+        """return mulliken labels of irreps in bitmask"""
+        return [
+            label
+            for i, label in enumerate(self.characters.keys())
+            if (mask >> i) & 1
+        ]
+
     def get_dimension(self, label: str):
         """Return dimension of inserted mulliken label"""
         dimensions = {
@@ -71,6 +71,7 @@ class AddSingles:
         frozen_MOs,
         wavefunction_name,
         wftype,
+        workers=1,
     ):
 
         # build all single excitations with respect to
@@ -124,7 +125,7 @@ class AddSingles:
             temp.append(det_tmp)
         det_basis = temp.copy()
         all_determinants = det_basis + excited_determinants
-        all_determinants = self.sCI.spinfuncs.remove_duplicates(
+        all_determinants = self.sCI.bitstrings.remove_duplicates(
             all_determinants
         )
 
@@ -136,11 +137,11 @@ class AddSingles:
         csf_coefficients = []
         # form csfs from determinant basis if required
         if wftype == "csf":
-            csf_coefficients, csfs = self.sCI.get_unique_csfs(
-                all_determinants, S, M_s
-            )
-            csf_coefficients, csfs = self.sCI.sort_determinants_in_csfs(
-                csf_coefficients, csfs
+            csf_coefficients, csfs = self.sCI.get_sorted_csfs(
+                self.sCI.get_unique_configurations(all_determinants),
+                S,
+                M_s,
+                workers=workers,
             )
             CI_coefficients = [1 if n == 0 else 0 for n in range(len(csfs))]
             determinant_representation = csfs
@@ -1,11 +1,35 @@
 #!/usr/bin/env python3
 
+import bisect
+import concurrent.futures
+import functools
+import gzip
+import itertools
+import lzma
+import mmap
+import os
 import random
 import time
 import numpy as np
-from fractions import Fraction
 from charactertables import CharacterTable
 from spincoupling import SpinCoupling
+from bitstring import Bitstring
+from csfwavefunction import CSFWavefunction
+from wavefunctionfile import WavefunctionFile
+from amoscanner import AmoScanner
+
+
+def init_worker(function):
+    """store function of a process pool in the worker process. It is sent
+    once per worker instead of once per task."""
+    global worker_function
+    worker_function = function
+
+
+def run_worker(*args):
+    """call the function stored by init_worker with the arguments of a
+    task"""
+    return worker_function(*args)
 
 
 # TODO change class name and seperate selected CI part to different class
@@ -14,6 +38,20 @@ class SelectedCI:
 
     def __init__(self):
         self.spinfuncs = SpinCoupling()
+        self.bitstrings = Bitstring()
+        self.character_tables = {}
+        self.orbital_irreps = {}
+        self.orbital_irrep_indices = {}
+        # format of intermediate wave function files that are only read by
+        # this program, can be text or binary
+        self.internal_format = "text"
+        # compression of intermediate wave function files, can be gz or xz
+        self.internal_compression = ""
+        # byte offsets of csfs in wave function files keyed by file name
+        self.wf_indices = {}
+        # irrep of the electronic state for point groups with degenerate
+        # irreps, by default determined from the initial determinant
+        self.state_symmetry = ""
 
     def custom_sort(self, x):
         return (abs(x), x < 0)
@@ -29,140 +67,710 @@ class SelectedCI:
         write_file=True,
         verbose=False,
         wftype="csf",
+        wavefunction=None,
+        n_csfs=None,
+        chunk_size=4096,
+        binary=False,
+        compression=None,
     ):
         """determinant representation in csfs needs to be sorted for
-        alpha spins first and then beta spins"""
-        if wftype == "csf":
-            out = "$csfs\n"
-            out += f"{int(len(csfs)): >7}\n"
-            for i, csf in enumerate(csfs):
-                out += f"{CI_coefficients[i]: >10.6E}       {len(csf)}\n"
+        alpha spins first and then beta spins. The wave function can also
+        be given as CSFWavefunction, then csf_coefficients, csfs and
+        CI_coefficients are ignored. The csfs and energies can be given as
+        iterators, which are formatted and written in chunks of chunk_size
+        csfs. The number of csfs for iterators has to be given as n_csfs,
+        otherwise the csfs are collected first. With binary the file is
+        written in the binary format of CSFWavefunction. The file is
+        compressed with compression gz or xz, by default the compression
+        is given by the extension of file_name."""
+        if binary and write_file:
+            self.write_binary_wf(
+                csf_coefficients,
+                csfs,
+                CI_coefficients,
+                pretext=pretext,
+                energies=energies,
+                file_name=file_name,
+                wftype=wftype,
+                wavefunction=wavefunction,
+            )
+            if verbose:
+                print(f"wave function written in binary format to {file_name}")
+            return
+        if wavefunction is None and n_csfs is None:
+            if not hasattr(csfs, "__len__"):
+                csfs = list(csfs)
+            n_csfs = len(csfs)
+        chunks = self.format_AMOLQC(
+            csf_coefficients,
+            csfs,
+            CI_coefficients,
+            pretext=pretext,
+            energies=energies,
+            wftype=wftype,
+            wavefunction=wavefunction,
+            n_csfs=n_csfs,
+            chunk_size=chunk_size,
+        )
+        if write_file:
+            with self.open_AMOLQC_file(
+                file_name, "wt", compression
+            ) as printfile:
+                for chunk in chunks:
+                    printfile.write(chunk)
+                    if verbose:
+                        print(chunk, end="")
+        elif verbose:
+            for chunk in chunks:
+                print(chunk, end="")
+        if verbose:
+            print()
+
+    def get_compression(self, filename, sniff=True):
+        """compression gz or xz of wave function file given by the extension
+        of filename. With sniff the compression of existing files is
+        determined from their first bytes."""
+        compression = ""
+        if filename.endswith(".gz") or filename.endswith(".xz"):
+            compression = filename[-2:]
+        if sniff and os.path.isfile(filename):
+            with open(filename, "rb") as f:
+                start = f.read(6)
+            compression = ""
+            if start.startswith(b"\x1f\x8b"):
+                compression = "gz"
+            elif start == b"\xfd7zXZ\x00":
+                compression = "xz"
+        return compression
+
+    def open_AMOLQC_file(self, filename, mode="rb", compression=None):
+        """open wave function file with transparent gzip or lzma
+        compression. By default the compression is determined by
+        get_compression, files are only sniffed for reading."""
+        if compression is None:
+            compression = self.get_compression(filename, sniff="r" in mode)
+        assert compression in (
+            "",
+            "gz",
+            "xz",
+        ), "compression has to be gz or xz."
+        if compression == "gz":
+            return gzip.open(filename, mode, compresslevel=6)
+        if compression == "xz":
+            if "r" in mode:
+                return lzma.open(filename, mode)
+            # fast preset, which compresses almost as good as the default
+            return lzma.open(filename, mode, preset=1)
+        if "b" in mode:
+            return open(filename, mode)
+        return open(filename, mode, buffering=2**20)
+
+    def write_binary_wf(
+        self,
+        csf_coefficients,
+        csfs,
+        CI_coefficients,
+        pretext="",
+        energies=[],
+        file_name="sCI_out",
+        wftype="csf",
+        wavefunction=None,
+    ):
+        """write wave function in binary format of CSFWavefunction. The
+        arguments are the same as for write_AMOLQC."""
+        if wavefunction is None:
+            if wftype == "det":
+                # determinants are stored as csfs with a single summand
+                entries = (
+                    (CI_coefficient, [1.0], [determinant])
+                    for CI_coefficient, determinant in zip(
+                        CI_coefficients, csfs
+                    )
+                )
+            else:
+                entries = zip(CI_coefficients, csf_coefficients, csfs)
+            wavefunction = CSFWavefunction().from_csfs(entries)
+        else:
+            # do not change energies of the given wave function
+            wavefunction = CSFWavefunction().from_arrays(
+                wavefunction.CI_coefficients,
+                wavefunction.offsets,
+                wavefunction.coefficients,
+                wavefunction.det_ids,
+                wavefunction.determinants,
+            )
+        wavefunction.energies = np.fromiter(energies, dtype=np.float64)
+        wavefunction.write_binary(file_name, pretext=pretext, wftype=wftype)
+
+    def read_binary_wf(self, filename, n_elec, mmap=True):
+        """read wave function in binary format as CSFWavefunction. The spins
+        of the determinants are assigned like for AMOLQC text files, the
+        first n_elec//2 electrons are alpha and the others beta electrons.
+        Returns wave function, pretext and wave function type."""
+        wavefunction = CSFWavefunction()
+        pretext, wftype = wavefunction.read_binary(filename, mmap=mmap)
+        determinants = wavefunction.determinants
+        n_alpha = n_elec // 2
+        if not (
+            (determinants[:, :n_alpha] > 0).all()
+            and (determinants[:, n_alpha:] < 0).all()
+        ):
+            # copy of determinant table only if spins differ
+            determinants = np.abs(determinants)
+            determinants[:, n_alpha:] *= -1
+            wavefunction.determinants = determinants
+        return wavefunction, pretext, wftype
+
+    def convert_AMOLQC(self, filename, filename_out, n_elec, binary=True):
+        """convert wave function file with energies from AMOLQC text to
+        binary format or with binary=False from binary to text format"""
+        wavefunction, pretext, wftype = self.read_AMOLQC_wf(filename, n_elec)
+        _, energies = self.parse_csf_energies(filename, -1)
+        self.write_AMOLQC(
+            [],
+            [],
+            [],
+            pretext=pretext,
+            energies=energies,
+            file_name=filename_out,
+            wftype=wftype,
+            wavefunction=wavefunction,
+            binary=binary,
+        )
+
+    def write_AMOLQC_partitioned(
+        self,
+        csf_coefficients,
+        csfs,
+        CI_coefficients,
+        file_names,
+        split_at=[],
+        partition=None,
+        order=None,
+        energies=[],
+        energy_files=None,
+        options=None,
+        wftype="csf",
+        chunk_size=4096,
+    ):
+        """write csfs of one wave function to several files in a single pass
+        without copies of the lists. The csfs are taken in the given order
+        of indices, by default in the order of the lists. The csfs at
+        positions split_at[k-1] to split_at[k] of this order are written to
+        file k, or with partition csf i is written to file partition(i).
+        Energies are written to the files in energy_files, by default to
+        all files. options is a list of dictionaries with further keyword
+        arguments of write_AMOLQC for each file. Returns the number of csfs
+        of each file."""
+        n_files = len(file_names)
+        if order is None:
+            order = range(len(csfs))
+        if energy_files is None:
+            energy_files = range(n_files)
+        if options is None:
+            options = [{} for _ in range(n_files)]
+        if partition is None:
+            assert (
+                len(split_at) == n_files - 1
+            ), "number of files and cut points differ."
+            cuts = [None, *split_at, None]
+            indices = [order[cuts[k] : cuts[k + 1]] for k in range(n_files)]
+        else:
+            indices = [[] for _ in range(n_files)]
+            for i in order:
+                indices[partition(i)].append(i)
+        for k, file_name in enumerate(file_names):
+            file_energies = []
+            if k in energy_files:
+                file_energies = (
+                    energies[i] for i in indices[k] if i < len(energies)
+                )
+            self.write_AMOLQC(
+                (
+                    (csf_coefficients[i] for i in indices[k])
+                    if wftype == "csf"
+                    else []
+                ),
+                (csfs[i] for i in indices[k]),
+                (CI_coefficients[i] for i in indices[k]),
+                energies=file_energies,
+                file_name=file_name,
+                wftype=wftype,
+                n_csfs=len(indices[k]),
+                chunk_size=chunk_size,
+                **options[k],
+            )
+        return [len(file_indices) for file_indices in indices]
+
+    def format_AMOLQC(
+        self,
+        csf_coefficients,
+        csfs,
+        CI_coefficients,
+        pretext="",
+        energies=[],
+        wftype="csf",
+        wavefunction=None,
+        n_csfs=None,
+        chunk_size=4096,
+    ):
+        """generate text of wave function in AMOLQC format in chunks of
+        chunk_size csfs"""
+        assert (
+            wftype == "csf" or wftype == "det"
+        ), "wftype has to be csf or det."
+        if wavefunction is not None:
+            n_csfs = wavefunction.n_csfs()
+            entries = wavefunction.iter_csfs()
+        else:
+            entries = zip(
+                CI_coefficients,
+                (
+                    csf_coefficients
+                    if wftype == "csf"
+                    else itertools.repeat([])
+                ),
+                csfs,
+            )
+        section = "$csfs\n" if wftype == "csf" else "$dets\n"
+        yield pretext + section + f"{int(n_csfs): >7}\n"
+        # format strings of determinant lines by number of electrons
+        templates = {}
+        lines = []
+        for i, (CI_coefficient, coefficients, csf) in enumerate(entries):
+            if wftype == "csf":
+                lines.append(f"{CI_coefficient: >10.6E}       {len(csf)}\n")
                 for j, determinant in enumerate(csf):
-                    out += f" {csf_coefficients[i][j]: 9.7E}"
-                    for electron in determinant:
-                        out += f"  {abs(electron)}"
-                    out += "\n"
-            out += "$end"
-            out = pretext + out
-
-        elif wftype == "det":
-            out = "$dets\n"
-            out += f"{int(len(csfs)): >7}\n"
-            for i, determinant in enumerate(csfs):
-                out += f"{CI_coefficients[i]: >10.6E}"
-                for electron in determinant:
-                    out += f"  {abs(electron)}"
-                out += "\n"
-            out += "$end"
-            out = pretext + out
-
-        if energies:
-            out += "\n"
-            out += "$nrgs\n"
-            for i, energy in enumerate(energies):
-                out += f"{i+1}\t"
-                out += f"{energy}\n"
-            out += "$end"
+                    n_elec = len(determinant)
+                    if n_elec not in templates:
+                        templates[n_elec] = (
+                            " {: 9.7E}" + "  {}" * n_elec + "\n"
+                        )
+                    lines.append(
+                        templates[n_elec].format(
+                            coefficients[j], *map(abs, determinant)
+                        )
+                    )
+            else:
+                # a determinant wave function in csr format stores each
+                # determinant as csf with a single summand
+                determinant = csf if wavefunction is None else csf[0]
+                n_elec = len(determinant)
+                if n_elec not in templates:
+                    templates[n_elec] = "{: >10.6E}" + "  {}" * n_elec + "\n"
+                lines.append(
+                    templates[n_elec].format(
+                        CI_coefficient, *map(abs, determinant)
+                    )
+                )
+            if (i + 1) % chunk_size == 0:
+                yield "".join(lines)
+                lines = []
+        lines.append("$end")
+        yield "".join(lines)
+
+        lines = []
+        n_energies = 0
+        for n_energies, energy in enumerate(energies, 1):
+            if n_energies == 1:
+                lines.append("\n$nrgs\n")
+            lines.append(f"{n_energies}\t{energy}\n")
+            if n_energies % chunk_size == 0:
+                yield "".join(lines)
+                lines = []
+        if n_energies:
+            lines.append("$end")
+            yield "".join(lines)
+
+    def split_AMOLQC_tokens(self, body, width=32):
+        """split text of csfs or determinants given as bytes in whitespace
+        separated tokens. Returns the text as uint8 array padded with width
+        whitespace characters, whether each byte belongs to a token, the
+        positions of all tokens and the number of tokens of each non-empty
+        line."""
+        # pad with whitespace such that every token is terminated and every
+        # leading token fits in a window of fixed width
+        buffer = np.frombuffer(body + b" " * width, dtype=np.uint8)
+        is_token = buffer > ord(" ")
+        is_start = is_token.copy()
+        is_start[1:] &= ~is_token[:-1]
+        starts = np.flatnonzero(is_start)
+        # index of first token of each line gives the number of tokens in
+        # each line
+        line_starts = np.flatnonzero(buffer == ord("\n")) + 1
+        first_tokens = np.searchsorted(starts, line_starts)
+        n_tokens = np.diff(first_tokens, prepend=0, append=len(starts))
+        n_tokens = n_tokens[n_tokens > 0]
+        return buffer, is_token, starts, n_tokens
+
+    def find_AMOLQC_entries(self, wftype, n_entries, n_tokens, n_summands):
+        """find the first lines of the first n_entries csfs or determinants
+        in lines with n_tokens tokens as given by split_AMOLQC_tokens.
+        n_summands is a function that returns the number of determinants
+        given in the header line of a csf. Returns array of first lines and
+        the number of lines of these csfs or determinants."""
+        if wftype != "csf":
+            entries = np.arange(min(n_entries, len(n_tokens)))
+            return entries, len(entries)
+        if len(n_tokens) > 1 and n_tokens[1] != 2:
+            # header lines of csfs with CI coefficient and number of
+            # determinants are the only lines with two tokens
+            entries = np.flatnonzero(n_tokens == 2)[:n_entries]
+        else:
+            # determinants of single electrons also have two tokens
+            entries = []
+            line = 0
+            while len(entries) < n_entries and line < len(n_tokens):
+                entries.append(line)
+                line += 1 + n_summands(line)
+            entries = np.array(entries, dtype=np.int64)
+        if not len(entries):
+            return entries, 0
+        return entries, int(entries[-1]) + 1 + n_summands(entries[-1])
+
+    def parse_AMOLQC_tokens(self, body):
+        """split text of csfs or determinants given as bytes in whitespace
+        separated tokens. Returns the number of tokens of each non-empty
+        line, the leading token of each line parsed as float and all
+        tokens parsed as non-negative integers, which are undefined for
+        leading tokens."""
+        width = 32
+        buffer, is_token, starts, n_tokens = self.split_AMOLQC_tokens(
+            body, width
+        )
+        is_leading = np.zeros(len(starts), dtype=bool)
+        is_leading[np.cumsum(n_tokens) - n_tokens] = True
+
+        leading = self.parse_AMOLQC_floats(buffer, starts[is_leading], width)
+
+        # parse all other tokens digit by digit
+        positions = starts[~is_leading]
+        numbers = np.zeros(len(positions), dtype=np.int64)
+        active = np.ones(len(positions), dtype=bool)
+        while active.any():
+            digits = buffer[positions] - np.uint8(ord("0"))
+            active &= digits <= 9
+            np.multiply(numbers, 10, out=numbers, where=active)
+            np.add(numbers, digits, out=numbers, where=active)
+            positions += active
+        assert not np.any(
+            is_token[positions]
+        ), "orbitals and numbers of determinants have to be integers."
+        integers = np.zeros(len(starts), dtype=np.int64)
+        integers[~is_leading] = numbers
+        return n_tokens, leading, integers
+
+    def parse_AMOLQC_floats(self, buffer, starts, width=32):
+        """parse tokens of byte buffer given as uint8 array at positions
+        starts as floats. The buffer has to be padded with width whitespace
+        characters."""
+        # parse tokens as fixed width byte strings, which are converted to
+        # floats by numpy
+        window = np.lib.stride_tricks.sliding_window_view(buffer, width)
+        window = window[starts]
+        lengths = np.argmax(window <= ord(" "), axis=1)
+        assert np.all(
+            window[np.arange(len(window)), lengths] <= ord(" ")
+        ), f"coefficients have more than {width - 1} characters."
+        window[np.arange(width) >= lengths[:, None]] = ord(" ")
+        return window.view(f"S{width}").reshape(-1).astype(np.float64)
+
+    def find_AMOLQC_section(self, text):
+        """find section of csfs or determinants in wave function given as
+        bytes. Returns start of the section, wave function type, number of
+        csfs or determinants, and start and end of the lines of csfs or
+        determinants."""
+        # the section starts at the first line containing its name
+        positions = [text.find(b"$det"), text.find(b"$csfs")]
+        if max(positions) < 0:
+            return len(text), "csf", 0, len(text), len(text)
+        position = min(p for p in positions if p >= 0)
+        wftype = "det" if position == positions[0] else "csf"
+        section_start = text.rfind(b"\n", 0, position) + 1
+        # number of csfs or determinants is given in the next line
+        count_start = text.find(b"\n", position) + 1
+        body_start = text.find(b"\n", count_start) + 1 or len(text)
+        n_entries = int(text[count_start:body_start])
+        body_end = text.find(b"$end", body_start)
+        if body_end < 0:
+            body_end = len(text)
+        return section_start, wftype, n_entries, body_start, body_end
+
+    def parse_AMOLQC(self, text, n_elec):
+        """parse wave function in AMOLQC format given as bytes in bulk.
+        Returns the pretext, the wave function type and arrays of CI
+        coefficients, number of determinants of each csf, coupling
+        coefficients and determinants of shape (n_dets, n_elec). The first
+        n_elec // 2 orbitals of a determinant are alpha spins. Determinants
+        of a determinant wave function are returned as csfs with a single
+        determinant and coupling coefficient 1."""
+        section_start, wftype, n_entries, body_start, body_end = (
+            self.find_AMOLQC_section(text)
+        )
+        body = text[body_start:body_end] if n_entries else b""
+        pretext = text[:section_start].decode()
+        n_tokens, leading, integers = self.parse_AMOLQC_tokens(body)
+        if not len(n_tokens):
+            return (
+                pretext,
+                wftype,
+                np.zeros(0),
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0),
+                np.zeros((0, 0), dtype=np.int64),
+            )
+        line_offsets = np.cumsum(n_tokens) - n_tokens
 
-        if verbose:
-            print(out)
-        if write_file:
-            with open(file_name, "w") as printfile:
-                printfile.write(out)
+        entries, n_lines = self.find_AMOLQC_entries(
+            wftype,
+            n_entries,
+            n_tokens,
+            lambda line: int(integers[line_offsets[line] + 1]),
+        )
+        if wftype == "csf":
+            headers = entries
+            CI_coefficients = leading[headers]
+            n_summands = integers[line_offsets[headers] + 1]
+            is_header = np.zeros(len(n_tokens), dtype=bool)
+            is_header[headers] = True
+            det_lines = np.flatnonzero(~is_header[:n_lines])
+            assert (
+                len(det_lines) == n_summands.sum()
+            ), "number of determinants in csfs is wrong."
+        else:
+            det_lines = entries
+            n_summands = np.ones(len(det_lines), dtype=np.int64)
+        n_columns = n_tokens[det_lines]
+        assert np.all(
+            n_columns == n_columns[0]
+        ), "determinants have different numbers of electrons."
+        if wftype == "csf":
+            coefficients = leading[det_lines]
+        else:
+            CI_coefficients = leading[det_lines]
+            coefficients = np.ones(len(det_lines))
+        determinants = integers[
+            line_offsets[det_lines, None] + np.arange(1, n_columns[0])
+        ]
+        determinants[:, n_elec // 2 :] *= -1
+        return (
+            pretext,
+            wftype,
+            CI_coefficients,
+            n_summands,
+            coefficients,
+            determinants,
+        )
+
+    def read_AMOLQC_wf(self, filename, n_elec, mmap=True):
+        """read wave function in AMOLQC text or binary format as
+        CSFWavefunction. Returns wave function, pretext and wave function
+        type."""
+        if CSFWavefunction().is_binary(filename):
+            return self.read_binary_wf(filename, n_elec, mmap=mmap)
+        with self.open_AMOLQC_file(filename) as f:
+            (
+                pretext,
+                wftype,
+                CI_coefficients,
+                n_summands,
+                coefficients,
+                determinants,
+            ) = self.parse_AMOLQC(f.read(), n_elec)
+        offsets = np.concatenate(([0], np.cumsum(n_summands)))
+        # determinants are stored as csfs with a single summand
+        wavefunction = CSFWavefunction().from_determinants(
+            CI_coefficients, offsets, coefficients, determinants
+        )
+        return wavefunction, pretext, wftype
 
-    def read_AMOLQC_csfs(self, filename, n_elec, wftype="csf", verbose=False):
-        """read in csfs of AMOLQC format with CI coefficients"""
+    def read_AMOLQC_csfs(
+        self, filename, n_elec, wftype="csf", verbose=False, csr=False
+    ):
+        """read in csfs of AMOLQC format with CI coefficients. Files in
+        binary format are detected and read as well. With csr the wave
+        function is returned as CSFWavefunction together with the
+        pretext."""
         csf_coefficients = []
         csfs = []
         CI_coefficients = []
-        csf_tmp = []
-        csf_coefficient_tmp = []
         pretext = ""
+        wavefunction = CSFWavefunction()
+        binary = wavefunction.is_binary(filename)
         # read csfs
         try:
-            with open(f"{filename}", "r") as f:
-                found_csf = False
-                found_det = False
-                for line in f:
-                    if "$det" in line:
-                        found_det = True
-                        # extract number of csfs
-                        line = f.readline()
-                        n_dets = int(line)
-                        line = f.readline()
-                        det_counter = 0
-                        if n_dets == 0:
-                            return (
-                                csf_coefficients,
-                                csfs,
-                                CI_coefficients,
-                                pretext,
-                            )
-
-                    if "$csfs" in line:
-                        found_csf = True
-                        new_csf = True
-                        # extract number of csfs
-                        line = f.readline()
-                        n_csfs = int(line)
-                        line = f.readline()
-                        # initialize counter to iterate over csfs
-                        csf_counter = 0
-                        if n_csfs == 0:
-                            return (
-                                csf_coefficients,
-                                csfs,
-                                CI_coefficients,
-                                pretext,
-                            )
-                    if not found_csf and not found_det:
-                        pretext += line
-                    if found_csf:
-                        entries = line.split()
-                        if new_csf:
-                            CI_coefficients.append(float(entries[0]))
-                            n_summands = int(entries[1])
-                            summand_counter = 0
-                            new_csf = False
-                            csf_counter += 1
-                        else:
-                            det = []
-                            for i in range(1, len(entries)):
-                                if i <= n_elec // 2:
-                                    det.append(1 * int(entries[i]))
-                                else:
-                                    det.append(-1 * int(entries[i]))
-                            csf_coefficient_tmp.append(float(entries[0]))
-                            csf_tmp.append(det.copy())
-                            summand_counter += 1
-                            if summand_counter == n_summands:
-                                new_csf = True
-                                csf_coefficients.append(csf_coefficient_tmp)
-                                csfs.append(csf_tmp)
-                                csf_coefficient_tmp = []
-                                csf_tmp = []
-                                if csf_counter == n_csfs:
-                                    break
-                    if found_det:
-                        det_counter += 1
-                        entries = line.split()
-                        CI_coefficients.append(float(entries[0]))
-                        det = []
-                        for i in range(1, len(entries)):
-                            if i <= n_elec // 2:
-                                det.append(1 * int(entries[i]))
-                            else:
-                                det.append(-1 * int(entries[i]))
-                        csfs.append(det.copy())
-                        if det_counter == n_dets:
-                            break
+            if csr or binary:
+                wavefunction, pretext, wftype_file = self.read_AMOLQC_wf(
+                    filename, n_elec
+                )
+            else:
+                with self.open_AMOLQC_file(filename) as f:
+                    (
+                        pretext,
+                        wftype_file,
+                        CI_array,
+                        n_summands,
+                        coefficients,
+                        determinants,
+                    ) = self.parse_AMOLQC(f.read(), n_elec)
         except FileNotFoundError:
             if verbose:
                 print(
                     f"File {filename} could not be found \
 to read AMOLQC wavefunction."
                 )
-        return csf_coefficients, csfs, CI_coefficients, pretext
+            if csr:
+                return wavefunction, pretext
+            return csf_coefficients, csfs, CI_coefficients, pretext
+
+        if csr:
+            return wavefunction, pretext
+        if binary:
+            return (
+                *self.wavefunction2lists(wavefunction, wftype_file),
+                pretext,
+            )
+        return (
+            *self.arrays2lists(
+                wftype_file, CI_array, n_summands, coefficients, determinants
+            ),
+            pretext,
+        )
+
+    def arrays2lists(
+        self, wftype, CI_coefficients, n_summands, coefficients, determinants
+    ):
+        """convert arrays of parse_AMOLQC in lists of coupling
+        coefficients, csfs and CI coefficients. The csfs of determinant wave
+        functions are the determinants and there are no coupling
+        coefficients."""
+        CI_coefficients = CI_coefficients.tolist()
+        determinants = determinants.tolist()
+        if wftype == "det":
+            return [], determinants, CI_coefficients
+        coefficients = coefficients.tolist()
+        offsets = np.concatenate(([0], np.cumsum(n_summands))).tolist()
+        csf_coefficients = []
+        csfs = []
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            csf_coefficients.append(coefficients[start:end])
+            csfs.append(determinants[start:end])
+        return csf_coefficients, csfs, CI_coefficients
+
+    def wavefunction2lists(self, wavefunction, wftype):
+        """convert CSFWavefunction in lists like arrays2lists"""
+        csf_coefficients, csfs, CI_coefficients = wavefunction.to_lists()
+        if wftype == "det":
+            return [], [csf[0] for csf in csfs], CI_coefficients
+        return csf_coefficients, csfs, CI_coefficients
+
+    def read_AMOLQC_header(self, filename):
+        """read only the lines of wave function file up to the number of
+        csfs or determinants. Returns pretext, wave function type and
+        number of csfs or determinants."""
+        wavefunction = CSFWavefunction()
+        if wavefunction.is_binary(filename):
+            pretext, wftype = wavefunction.read_binary(filename)
+            return pretext, wftype, wavefunction.n_csfs()
+        lines = []
+        with self.open_AMOLQC_file(filename) as f:
+            for line in f:
+                lines.append(line)
+                if b"$det" in line or b"$csfs" in line:
+                    lines.append(f.readline())
+                    break
+        text = b"".join(lines)
+        section_start, wftype, n_entries, _, _ = self.find_AMOLQC_section(
+            text
+        )
+        return text[:section_start].decode(), wftype, n_entries
+
+    def get_AMOLQC_index(self, filename):
+        """return byte offsets of the first token of each csf or
+        determinant in wave function file in AMOLQC text format and the end
+        of the last one. The offsets are cached until the file changes."""
+        stat = os.stat(filename)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if filename in self.wf_indices and self.wf_indices[filename][0] == key:
+            return self.wf_indices[filename][1]
+        with self.open_AMOLQC_file(filename) as f:
+            text = f.read()
+        _, wftype, n_entries, body_start, body_end = self.find_AMOLQC_section(
+            text
+        )
+        body = text[body_start:body_end] if n_entries else b""
+        buffer, _, starts, n_tokens = self.split_AMOLQC_tokens(body)
+        line_offsets = np.cumsum(n_tokens) - n_tokens
+
+        def n_summands(line):
+            """number of determinants in header line of csf"""
+            start = starts[line_offsets[line] + 1]
+            end = body.find(b"\n", start)
+            return int(body[start : end if end >= 0 else None].split()[0])
+
+        entries, n_lines = self.find_AMOLQC_entries(
+            wftype, n_entries, n_tokens, n_summands
+        )
+        # the last csf or determinant ends at the next line
+        end = len(body)
+        if n_lines < len(n_tokens):
+            end = starts[line_offsets[n_lines]]
+        offsets = body_start + np.append(
+            starts[line_offsets[entries]], end
+        ).astype(np.int64)
+        self.wf_indices[filename] = (key, offsets)
+        return offsets
+
+    def read_AMOLQC_CI_coefficients(self, filename, width=32):
+        """read only the CI coefficients of a wave function file in AMOLQC
+        text format. Only a window of width bytes at the offset of each csf
+        is read from the memory mapped file or, for compressed files, from
+        blocks of the decompressed text."""
+        offsets = self.get_AMOLQC_index(filename)
+        if len(offsets) < 2:
+            return np.zeros(0)
+        # windows are cut at the end of each csf
+        positions = np.minimum(
+            offsets[:-1, None] + np.arange(width), offsets[1:, None] - 1
+        )
+        windows = np.empty(positions.shape, dtype=np.uint8)
+        with self.open_AMOLQC_file(filename) as f:
+            if self.get_compression(filename):
+                # csfs are read in blocks of about block_size bytes from
+                # the decompressed text
+                block_size = 2**24
+                block_start = int(offsets[0])
+                f.seek(block_start)
+                first = 0
+                while first < len(windows):
+                    last = max(
+                        first + 1,
+                        np.searchsorted(
+                            offsets[:-1], block_start + block_size
+                        ),
+                    )
+                    rows = positions[first:last]
+                    block = f.read(int(rows[-1, -1]) + 1 - block_start)
+                    windows[first:last] = np.frombuffer(block, dtype=np.uint8)[
+                        rows - block_start
+                    ]
+                    block_start += len(block)
+                    first = last
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    text = np.frombuffer(m, dtype=np.uint8)
+                    windows[:] = text[positions]
+                    del text
+        windows[positions < offsets[:-1, None] + np.arange(width)] = ord(" ")
+        buffer = np.append(windows.ravel(), np.full(width, ord(" "), np.uint8))
+        return self.parse_AMOLQC_floats(
+            buffer, np.arange(len(windows)) * width, width
+        )
+
+    def open_AMOLQC(self, filename, n_elec):
+        """open wave function file in AMOLQC text or binary format for lazy
+        reading of parts of the file"""
+        return WavefunctionFile(self, filename, n_elec)
 
     def parse_csf_energies(
         self,
@@ -172,29 +780,28 @@ to read AMOLQC wavefunction."
         return_err=False,
         verbose=False,
     ):
-        """able to read from amo or from wf file"""
+        """able to read from amo or from wf file in text or binary
+        format"""
         energies = []
         indices = []
         errors = []
+        wavefunction = CSFWavefunction()
+        if wavefunction.is_binary(input_amo):
+            wavefunction.read_binary(input_amo)
+            # energies of binary files are ordered by index
+            energies = wavefunction.energies.tolist()
+            if n_csfs >= 0:
+                energies = energies[:n_csfs]
+            indices = list(range(1, len(energies) + 1))
+            if return_err:
+                return indices, energies, errors
+            return indices, energies
         try:
-            with open(f"{input_amo}", "r") as reffile:
-                found = False
-                counter = 0
-                for line in reffile:
-                    if found and "$end" in line:
-                        found = False
-                    if counter == n_csfs:
-                        break
-                    if found:
-                        counter += 1
-                        items = line.split()
-                        indices.append(int(items[0]))
-                        energies.append(float(items[1]))
-                        # errors.append(float(items[2]))
-                    if "Index  Energy difference" in line:
-                        found = True
-                    if "$nrgs" in line:
-                        found = True
+            # energies of "Index  Energy difference" and $nrgs blocks
+            # reading stops after n_csfs energies
+            indices, energies = AmoScanner(
+                self.open_AMOLQC_file
+            ).get_energies(input_amo, n_csfs)
             if sort_by_idx:
                 idx = np.array(indices).argsort()
                 indices = [indices[i] for i in idx]
@@ -255,6 +862,37 @@ to parse CSF energy contributions."
 
         return CI_coefficient_matrix, transformation_matrix, det_basis
 
+    def get_character_table(self, point_group):
+        """return character table of point group. Each table is loaded
+        only once."""
+        if point_group not in self.character_tables:
+            self.character_tables[point_group] = CharacterTable(point_group)
+        return self.character_tables[point_group]
+
+    def get_orbital_irreps(self, orbital_symmetry, point_group):
+        """return lookup tables of xor encoded orbital irreps, which have to
+        be one-dimensional. The first table holds the irrep code of each orbital,
+        the second one the xor product of the orbital irreps for all 256
+        bit patterns of each byte of a bitstring. The tables are built only
+        once per orbital symmetry and point group."""
+        key = (tuple(orbital_symmetry), point_group)
+        if key not in self.orbital_irreps:
+            symmetry = self.get_character_table(point_group)
+            assert symmetry.has_irrep_codes(
+                orbital_symmetry
+            ), f"xor encoding of irreps requires one-dimensional orbital irreps of {point_group}."
+            codes = [symmetry.irrep2int(label) for label in orbital_symmetry]
+            n_bytes = self.bitstrings.n_words(len(codes)) * 8
+            codes_padded = np.zeros(n_bytes * 8, dtype=np.uint8)
+            codes_padded[: len(codes)] = codes
+            byte_table = np.zeros((n_bytes, 256), dtype=np.uint8)
+            patterns = np.arange(256)
+            for bit in range(8):
+                is_set = (patterns >> bit) & 1 == 1
+                byte_table[:, is_set] ^= codes_padded[bit::8, None]
+            self.orbital_irreps[key] = (codes, byte_table)
+        return self.orbital_irreps[key]
+
     def get_determinant_symmetry(
         self, determinant, orbital_symmetry, molecule_symmetry
     ):
@@ -262,70 +900,251 @@ to parse CSF energy contributions."
         with certain symmetry"""
         # TODO write test for get_determinant symmetry
         # get characters
-        symmetry = CharacterTable(molecule_symmetry)
-        character = symmetry.characters
-        # initialize product with symmetry of first electron
-        prod = character[orbital_symmetry[abs(determinant[0]) - 1]]
-        # multiply up for each electron the orbital symmetry.
-        for i in range(1, len(determinant)):
+        symmetry = self.get_character_table(molecule_symmetry)
+        if symmetry.has_irrep_codes(orbital_symmetry):
+            # direct product of irreps is xor of their codes
+            codes, _ = self.get_orbital_irreps(
+                orbital_symmetry, molecule_symmetry
+            )
+            prod = 0
+            for electron in determinant:
+                prod ^= codes[abs(electron) - 1]
+            return symmetry.int2irrep(prod)
+        # multiply up the characters of degenerate irreps. The label is None
+        # if the direct product is reducible.
+        prod = symmetry.characters[symmetry.totally_symmetric()]
+        for electron in determinant:
             prod = symmetry.multiply(
-                prod, character[orbital_symmetry[abs(determinant[i]) - 1]]
+                prod, symmetry.characters[orbital_symmetry[abs(electron) - 1]]
             )
-        symm = symmetry.character2label(prod)
-        return symm
+        return symmetry.character2label(prod)
+
+    def get_orbital_irrep_indices(self, orbital_symmetry, point_group):
+        """return index of the irrep of each orbital in the character
+        table. The list is built only once per orbital symmetry and point
+        group."""
+        key = (tuple(orbital_symmetry), point_group)
+        if key not in self.orbital_irrep_indices:
+            labels = list(self.get_character_table(point_group).characters)
+            self.orbital_irrep_indices[key] = [
+                labels.index(label) for label in orbital_symmetry
+            ]
+        return self.orbital_irrep_indices[key]
+
+    def get_determinant_irreps(
+        self, determinant, orbital_symmetry, point_group
+    ):
+        """determine all irreps contained in the direct product of the
+        orbital irreps of the determinant. Returns bitmask over the irreps
+        of the character table."""
+        symmetry = self.get_character_table(point_group)
+        product_masks = symmetry.get_product_masks()
+        irreps = self.get_orbital_irrep_indices(orbital_symmetry, point_group)
+        labels = list(symmetry.characters)
+        mask = 1 << labels.index(symmetry.totally_symmetric())
+        for electron in determinant:
+            mask = int(product_masks[irreps[abs(electron) - 1], mask])
+        return mask
+
+    def get_determinants_irreps(
+        self, determinants, orbital_symmetry, point_group
+    ):
+        """determine for all determinants at once the irreps contained in
+        the direct product of their orbital irreps. Determinants can be
+        passed as list of signed-int determinants or as uint64 bitstring
+        array of shape (n_dets, 2, n_words). Returns array of bitmasks over
+        the irreps of the character table."""
+        symmetry = self.get_character_table(point_group)
+        product_masks = symmetry.get_product_masks()
+        irreps = self.get_orbital_irrep_indices(orbital_symmetry, point_group)
+        labels = list(symmetry.characters)
+        if not isinstance(determinants, np.ndarray) or (
+            determinants.dtype != np.uint64
+        ):
+            determinants = self.bitstrings.dets2array(
+                determinants, len(irreps)
+            )
+        masks = np.full(
+            determinants.shape[0],
+            1 << labels.index(symmetry.totally_symmetric()),
+            dtype=np.int64,
+        )
+        word_size = self.bitstrings.word_size
+        for k, irrep in enumerate(irreps):
+            word = k // word_size
+            if word >= determinants.shape[2]:
+                break
+            shift = np.uint64(k % word_size)
+            for spin in range(2):
+                occupied = (determinants[:, spin, word] >> shift) & np.uint64(
+                    1
+                ) == 1
+                masks = np.where(occupied, product_masks[irrep, masks], masks)
+        return masks
+
+    def get_target_irrep(self, det_ini, orbital_symmetry, point_group):
+        """return bitmask of the irrep that excited determinants of det_ini
+        have to contain to be symmetry allowed. This is the irrep
+        state_symmetry if it is set. Otherwise it is the symmetry of det_ini
+        or, if the direct product of the orbital irreps of det_ini is
+        reducible for degenerate irreps, the totally symmetric irrep."""
+        symmetry = self.get_character_table(point_group)
+        irreps_of_det_ini = self.get_determinant_irreps(
+            det_ini, orbital_symmetry, point_group
+        )
+        labels = list(symmetry.characters)
+        if self.state_symmetry:
+            target_irrep = 1 << labels.index(self.state_symmetry)
+        elif irreps_of_det_ini & (irreps_of_det_ini - 1) == 0:
+            target_irrep = irreps_of_det_ini
+        else:
+            target_irrep = 1 << labels.index(symmetry.totally_symmetric())
+        assert irreps_of_det_ini & target_irrep, (
+            f"irrep {symmetry.mask2labels(target_irrep)[0]} is not contained "
+            f"in the initial determinant {det_ini}, the state symmetry has "
+            "to be given."
+        )
+        return target_irrep
+
+    def screen_determinants(
+        self, determinants, orbital_symmetry, point_group, target_irrep
+    ):
+        """generate the determinants whose direct product of orbital irreps
+        contains the irrep of bitmask target_irrep. The determinants are
+        screened in blocks with get_determinants_irreps."""
+        determinants = iter(determinants)
+        while True:
+            block = list(itertools.islice(determinants, 4096))
+            if not block:
+                return
+            irreps = self.get_determinants_irreps(
+                block, orbital_symmetry, point_group
+            )
+            for determinant, is_allowed in zip(
+                block, (irreps & target_irrep != 0).tolist()
+            ):
+                if is_allowed:
+                    yield determinant
+
+    def get_determinants_symmetry(
+        self, determinants, orbital_symmetry, molecule_symmetry
+    ):
+        """determine xor encoded irreps of all determinants at once for
+        one-dimensional orbital irreps. Determinants can be passed as list of
+        signed-int determinants or as uint64 bitstring array of shape
+        (n_dets, 2, n_words). Doubly occupied orbitals do not contribute,
+        such that only the open shells alpha xor beta are multiplied up."""
+        _, byte_table = self.get_orbital_irreps(
+            orbital_symmetry, molecule_symmetry
+        )
+        n_words = byte_table.shape[0] // 8
+        if not isinstance(determinants, np.ndarray) or (
+            determinants.dtype != np.uint64
+        ):
+            determinants = self.bitstrings.dets2array(
+                determinants, n_words * self.bitstrings.word_size
+            )
+        open_shells = (
+            determinants[:, 0, :n_words] ^ determinants[:, 1, :n_words]
+        )
+        open_bytes = open_shells.astype("<u8").view(np.uint8)
+        n_bytes = open_bytes.shape[1]
+        return np.bitwise_xor.reduce(
+            byte_table[np.arange(n_bytes), open_bytes], axis=1
+        )
+
+    def sort_determinants(self, determinants):
+        """sort integer array of determinants of shape (n_dets, n_elec) in
+        AMOLQC format with alpha spins first and beta spins second, both in
+        ascending order of orbitals. Returns the sorted determinants and
+        whether the number of swaps of each determinant is odd."""
+        determinants = np.asarray(determinants, dtype=np.int64)
+        n_dets, n_elec = determinants.shape
+        # sort key places beta spins behind all alpha spins
+        n_orbitals = np.abs(determinants).max(initial=0)
+        keys = np.where(
+            determinants > 0, determinants, n_orbitals - determinants
+        )
+        order = np.argsort(keys, axis=1, kind="stable")
+        # parity of the permutation is given by the number of inversions.
+        # The pairwise comparison is done in blocks of determinants to bound
+        # the memory.
+        upper = np.triu(np.ones((n_elec, n_elec), dtype=bool), k=1)
+        n_block = max(1, 2**22 // max(1, n_elec**2))
+        is_odd = np.zeros(n_dets, dtype=bool)
+        for start in range(0, n_dets, n_block):
+            block = keys[start : start + n_block]
+            inversions = (block[:, :, None] > block[:, None, :]) & upper
+            is_odd[start : start + n_block] = (
+                inversions.sum(axis=(1, 2)) % 2 == 1
+            )
+        return np.take_along_axis(determinants, order, axis=1), is_odd
 
     def sort_determinant(self, coefficient, determinant):
-        """"""
-        # replace alpha spin by inverse as fraction
-        for i, _ in enumerate(determinant):
-            if determinant[i] > 0:
-                determinant[i] = Fraction(1, determinant[i])
-        # bubble sort from large to small
-        n_swap = 0
-        for i in range(len(determinant) - 1, 0, -1):
-            for j in range(i):
-                if determinant[j] < determinant[j + 1]:
-                    determinant[j], determinant[j + 1] = (
-                        determinant[j + 1],
-                        determinant[j],
-                    )
-                    coefficient = -1 * coefficient
-                    n_swap += 1
-        # replacing inverse alpha spins again by their inverse
-        for i, _ in enumerate(determinant):
-            if determinant[i] > 0:
-                determinant[i] = int(Fraction(1, determinant[i]))
+        """sort determinant in AMOLQC format and change the sign of the
+        coefficient for an odd permutation"""
+        determinants, is_odd = self.sort_determinants([determinant])
+        determinant[:] = determinants[0].tolist()
+        if is_odd[0]:
+            coefficient = -1 * coefficient
         return coefficient, determinant
 
     def sort_determinants_in_csfs(self, csf_coefficients, csfs):
         "sort each determinant in determinant list to obtain correct AMOLQC format"
+        # sort all determinants with the same number of electrons at once
+        groups = {}
         for i, determinants in enumerate(csfs):
-            for j in range(len(determinants)):
-                csf_coefficients[i][j], csfs[i][j] = self.sort_determinant(
-                    csf_coefficients[i][j], csfs[i][j]
-                )
+            for j, det in enumerate(determinants):
+                groups.setdefault(len(det), []).append((i, j))
+        for indices in groups.values():
+            determinants, is_odd = self.sort_determinants(
+                [csfs[i][j] for i, j in indices]
+            )
+            for (i, j), det, odd in zip(
+                indices, determinants.tolist(), is_odd.tolist()
+            ):
+                csfs[i][j] = det
+                if odd:
+                    csf_coefficients[i][j] = -1 * csf_coefficients[i][j]
         return csf_coefficients, csfs
 
     def determine_excitations(
         self, wavefunction, reference_determinant, wf_type
     ):
         """determine the excitations in all csfs with respect to a reference determinant. Return a list of numbers that correspond to the excitation (1=single, 2=double ...)"""
-        excitation_type = []
+        determinants = []
         if wf_type == "csf":
-            for csf in wavefunction:
-                difference = 0
-                for electron in csf[0]:
-                    if electron not in reference_determinant:
-                        difference += 1
-                excitation_type.append(difference)
+            determinants = [csf[0] for csf in wavefunction]
         elif wf_type == "det":
-            for det in wavefunction:
-                difference = 0
-                for electron in det:
-                    if electron not in reference_determinant:
-                        difference += 1
-                excitation_type.append(difference)
-        return excitation_type
+            determinants = wavefunction
+        if not len(determinants):
+            return []
+        excitation_type = self.determine_excitation_degrees(
+            determinants, reference_determinant
+        )
+        return excitation_type.tolist()
+
+    def determine_excitation_degrees(
+        self, determinants, reference_determinant
+    ):
+        """determine for an array of determinants at once the excitation with
+        respect to a reference determinant by popcount of the bitstring
+        differences. Determinants can be passed as list of signed-int
+        determinants or as uint64 bitstring array of shape
+        (n_dets, 2, n_words)."""
+        if not isinstance(determinants, np.ndarray) or (
+            determinants.dtype != np.uint64
+        ):
+            n_orbitals = max(
+                max(abs(e) for det in determinants for e in det),
+                max(abs(e) for e in reference_determinant),
+            )
+            determinants = self.bitstrings.dets2array(determinants, n_orbitals)
+        n_orbitals = determinants.shape[-1] * self.bitstrings.word_size
+        reference = self.bitstrings.dets2array(
+            [reference_determinant], n_orbitals
+        )[0]
+        return self.bitstrings.excitation_degrees(determinants, reference)
 
     def sort_order_of_csfs(
         self,
@@ -364,6 +1183,29 @@ to parse CSF energy contributions."
         # Check if all values in the counter (i.e., occurrences) are exactly 2
         return all(determinant.count(x) == 2 for x in set(determinant))
 
+    def get_sort_order(self, ref_list, side=1, absol=False):
+        """indices that sort ref_list like sort_lists_by_list"""
+        assert (
+            side == 1 or side == -1
+        ), "input variable 'side' needs to be +1 or -1."
+        if absol:
+            sort_list = side * np.abs(np.array(ref_list))
+        else:
+            sort_list = side * np.array(ref_list)
+        return sort_list.argsort()
+
+    def get_partial_sort_order(self, ref_list, start, side=1, absol=False):
+        """indices that keep the first start entries in place and sort the
+        remaining entries by their values in ref_list[start:] like
+        sort_lists_by_list"""
+        return np.concatenate(
+            (
+                np.arange(start, dtype=np.int64),
+                start
+                + self.get_sort_order(ref_list[start:], side=side, absol=absol),
+            )
+        )
+
     def sort_lists_by_list(
         self, list_of_lists: list, ref_list: list, side=1, absol=False
     ) -> list:
@@ -391,12 +1233,7 @@ to parse CSF energy contributions."
             side == 1 or side == -1
         ), "input variable 'side' needs to be +1 or -1."
 
-        if absol:
-            sort_list = side * np.abs(np.array(ref_list))
-        else:
-            sort_list = side * np.array(ref_list)
-
-        indices = sort_list.argsort()
+        indices = self.get_sort_order(ref_list, side=side, absol=absol)
 
         for idx, l in enumerate(list_of_lists):
             if not l:
@@ -506,6 +1343,20 @@ to parse CSF energy contributions."
             second_parts = [[] for _ in range(len(first_parts))]
         return first_parts, second_parts
 
+    def cut_csfs(self, csf_coefficients, csfs, CI_coefficients, thresh):
+        """sort csfs by the absolute value of their CI coefficients and cut
+        off the csfs whose CI coefficients are not larger than thresh.
+        Returns the kept and the cut csf coefficients, csfs and CI
+        coefficients."""
+        first_parts, second_parts = self.cut_lists(
+            [csf_coefficients, csfs, CI_coefficients],
+            CI_coefficients,
+            thresh,
+            side=-1,
+            absol=True,
+        )
+        return (*first_parts, *second_parts)
+
     def build_energy_lowest_detetminant(self, n_elecs):
         # create HF determinant, if no initial determinant is passed
         det = []
@@ -532,6 +1383,41 @@ to parse CSF energy contributions."
         frozen_MOs=[],
     ):
         """create all excitation determinants"""
+        return list(
+            self.iter_excitations(
+                n_orbitals,
+                excitations,
+                det_ini,
+                orbital_symmetry=orbital_symmetry,
+                tot_sym=tot_sym,
+                det_reference=det_reference,
+                core=core,
+                frozen_MOs=frozen_MOs,
+            )
+        )
+
+    def iter_excitations(
+        self,
+        n_orbitals,
+        excitations,
+        det_ini,
+        orbital_symmetry=[],
+        tot_sym="",
+        det_reference=[],
+        core=[],
+        frozen_MOs=[],
+        chunk_size=0,
+    ):
+        """generate all excitation determinants lazily. Yields the symmetry
+        filtered determinants one by one or in lists of chunk_size
+        determinants, such that the full excitation space is never stored.
+
+        Each excitation is the replacement of n electrons i < j < ... by n
+        virtual orbitals a < b < ... as i->a, j->b, ... . An excitation is
+        only performed if all replacements conserve the spin and excite to
+        a higher orbital. Since the excited determinant determines the
+        replaced electrons and virtual orbitals, every determinant is
+        generated only once and no duplicates have to be removed."""
 
         # all unoccupied MOs are virtual orbitals
         virtuals = [
@@ -543,315 +1429,473 @@ to parse CSF energy contributions."
         # consider symmetry if symmetry is specified in input
         consider_symmetry = bool(orbital_symmetry)
 
-        # determine symmetry of input determinant
+        # determine irrep that excited determinants have to contain
         if consider_symmetry:
-            symm_of_det_ini = self.get_determinant_symmetry(
+            symmetry = self.get_character_table(tot_sym)
+            target_irrep = self.get_target_irrep(
                 det_ini, orbital_symmetry, tot_sym
             )
 
-        # initialize list to mask excitations
-        n_elec = len(det_ini)
-        n_virt = len(virtuals)
-        occ_mask = [True for _ in range(n_elec)]
-        virt_mask = [True for _ in range(n_virt)]
+        # electrons that correspond to excited electrons in reference
+        # determinant, virtual orbitals that are occupied in the reference
+        # determinant, core electrons and frozen MOs are not excited.
+        occupied = [
+            i
+            for i in det_ini
+            if not (det_reference and i not in det_reference)
+            and not (core and i in core)
+        ]
+        virtuals = [
+            a
+            for a in virtuals
+            if not (det_reference and a in det_reference)
+            and not (frozen_MOs and a in frozen_MOs)
+        ]
+        # sort such that beta electrons appear first and then alpha
+        occupied.sort()
+        virtuals.sort()
+
+        # holes and virtual orbitals are paired by spin. Since beta
+        # electrons appear first, the k-th hole is only paired with a
+        # virtual orbital of the same spin if the number of beta holes
+        # equals the number of beta virtual orbitals. Alpha and beta
+        # virtual tuples are enumerated separately and combined for each
+        # excitation class (aa, bb, ab, ...), such that spin forbidden
+        # tuples are never generated.
+        virtuals_by_spin = (
+            [a for a in virtuals if a > 0],
+            [a for a in virtuals if a < 0],
+        )
 
-        # do excitations from electrons that correspond to not excited
-        # electrons in reference determinant
-        if det_reference:
-            # assert bool(det_reference), "reference_excitation is True
-            # but no reference state has been passed"
-            virtuals_reference = [
-                i
-                for i in range(-n_orbitals, n_orbitals + 1)
-                if i not in det_reference and i != 0
-            ]
-            for idx, i in enumerate(det_ini):
-                if i not in det_reference:
-                    occ_mask[idx] = False
-            for idx, a in enumerate(virtuals):
-                if a not in virtuals_reference:
-                    virt_mask[idx] = False
-
-        # if core electrons are passed, no excitations shall be
-        # performed with these electrons
-        if core:
-            for idx, i in enumerate(det_ini):
-                if i in core:
-                    occ_mask[idx] = False
-        if frozen_MOs:
-            for idx, i in enumerate(virtuals):
-                if i in frozen_MOs:
-                    virt_mask[idx] = False
-
-        # generate all required excitations on initial determinant
-        excited_determinants = []
-
-        def get_n_fold_excitation_recursive(
-            occupied, virtual, n_fold_excitation, occ_mask=[], virt_mask=[]
-        ):
-            """perform single excitation for all electrons in
-            all virtual orbitals that are not masked"""
-            n_elec = len(occupied)
-            n_virt = len(virtual)
-
-            # initialize mask lists if lists are empty
-            if not occ_mask:
-                occ_mask = [True for _ in range(n_elec)]
-            if not virt_mask:
-                virt_mask = [True for _ in range(n_virt)]
-            virt_mask_save = virt_mask.copy()
-            occ_mask_save = occ_mask.copy()
-
-            for i in range(n_elec):
-                for a in range(n_virt):
-                    # check if i and a have the same sign (not spin forbidden)
-                    #       if occupied lower than virtual
-                    #       if electron and virtual orbital have already
-                    #           been changed by previous excitation
-                    is_spin_allowed = occupied[i] * virtual[a] > 0
-                    is_excitation = abs(occupied[i]) < abs(virtual[a])
-                    not_touched = all([occ_mask[i], virt_mask[a]])
-                    #
-                    if is_spin_allowed and is_excitation and not_touched:
-                        occupied_tmp = occupied.copy()
-                        virtual_tmp = virtual.copy()
-                        occupied_tmp[i], virtual_tmp[a] = (
-                            virtual[a],
-                            occupied[i],
-                        )
-                        if n_fold_excitation == 1:
-                            occupied_tmp = sorted(
-                                occupied_tmp, key=self.custom_sort
-                            )
-                            excited_determinants.append(occupied_tmp)
-                        else:
-                            # mask already excited electron in occupied and
-                            # already occupied orbital in virtual
-                            occ_mask[i] = False
-                            virt_mask[a] = False
-                            get_n_fold_excitation(
-                                occupied_tmp,
-                                virtual_tmp,
-                                n_fold_excitation - 1,
-                                occ_mask,
-                                virt_mask,
-                            )
-                            occ_mask = occ_mask_save.copy()
-                            virt_mask = virt_mask_save.copy()
+        # for one-dimensional orbital irreps the excited determinant has the
+        # symmetry of the initial determinant if the direct product of the virtual
+        # orbitals equals the direct product of the excited electrons.
+        # Group the virtual orbitals by their xor encoded irrep to enumerate
+        # only virtual tuples that restore the symmetry instead of filtering
+        # afterwards.
+        prune_symmetry = False
+        if consider_symmetry:
+            prune_symmetry = symmetry.has_irrep_codes(orbital_symmetry)
+        if prune_symmetry:
+            codes, _ = self.get_orbital_irreps(orbital_symmetry, tot_sym)
+            irrep = {i: codes[abs(i) - 1] for i in occupied + virtuals}
+            virtuals_by_irrep = []
+            for virtuals_spin in virtuals_by_spin:
+                groups = [[] for _ in range(max(codes) + 1)]
+                for idx, a in enumerate(virtuals_spin):
+                    groups[irrep[a]].append(idx)
+                virtuals_by_irrep.append(groups)
+
+        def get_spin_particles(holes_spin, spin, required):
+            """enumerate virtual tuples of one spin in lexicographic order,
+            in which the k-th virtual orbital is higher than the k-th hole.
+            For required >= 0 the direct product of the virtual orbitals
+            has to equal the irrep code required."""
+            virtuals_spin = virtuals_by_spin[spin]
+            n = len(holes_spin)
+            if not n:
+                if required <= 0:
+                    yield ()
+                return
+
+            def extend(k, start, particles, code):
+                hole = abs(holes_spin[k])
+                if not spin:
+                    # alpha virtual orbitals are ascending in energy
+                    start = max(
+                        start, bisect.bisect_right(virtuals_spin, hole)
+                    )
+                if k < n - 1:
+                    candidates = range(start, len(virtuals_spin) - n + k + 1)
+                elif required < 0:
+                    candidates = range(start, len(virtuals_spin))
+                else:
+                    # take the last virtual orbital from the irrep that
+                    # completes the direct product
+                    target = code ^ required
+                    if target >= len(virtuals_by_irrep[spin]):
+                        return
+                    group = virtuals_by_irrep[spin][target]
+                    candidates = group[bisect.bisect_left(group, start) :]
+                for idx in candidates:
+                    a = virtuals_spin[idx]
+                    if hole >= abs(a):
+                        # beta virtual orbitals are descending in energy
+                        break
+                    if k == n - 1:
+                        yield particles + (a,)
+                    elif required < 0:
+                        yield from extend(k + 1, idx + 1, particles + (a,), 0)
                     else:
-                        continue
-
-        def get_n_fold_excitation(
-            occupied, virtual, n_fold_excitation, occ_mask=[], virt_mask=[]
-        ):
-            """perform single excitation for all electrons in all virtual
-            orbitals that are not masked"""
-            n_elec = len(occupied)
-            n_virt = len(virtual)
-
-            # initialize mask lists if lists are empty
-            if not occ_mask:
-                occ_mask = [True for _ in range(n_elec)]
-            if not virt_mask:
-                virt_mask = [True for _ in range(n_virt)]
-
-            # sort such that beta electrons appear first and then alpha
-            idx = np.array(occupied).argsort()
-            occupied = [occupied[i] for i in idx]
-            occ_mask = [occ_mask[i] for i in idx]
-            idx = np.array(virtual).argsort()
-            virtual = [virtual[i] for i in idx]
-            virt_mask = [virt_mask[i] for i in idx]
-
-            # electrons are selected for unique excitation.
-            excite_from_idx = [i for i in range(n_fold_excitation)]
-            done = False
-            # mimic n_tuple sum over occupied orbitals. Then perform excita-
-            # tions as i->a, j->b, k->c ...
-            while not done:
-                excite_to_idx = [i for i in range(n_fold_excitation)]
-                # mimic n_fold sum over virtual orbitals.
-                while True:
-                    occupied_tmp = occupied.copy()
-                    # do excitation.
-                    # check if i and a have the same sign (not spin forbidden)
-                    #       if occupied lower than virtual
-                    #       if electron and virtual orbital have already been
-                    #           changed by previous excitation
-                    for k in range(n_fold_excitation):
-                        is_spin_allowed = (
-                            occupied[excite_from_idx[k]]
-                            * virtual[excite_to_idx[k]]
-                            > 0
-                        )
-                        is_excitation = abs(
-                            occupied[excite_from_idx[k]]
-                        ) < abs(virtual[excite_to_idx[k]])
-                        not_touched = all(
-                            [
-                                occ_mask[excite_from_idx[k]],
-                                virt_mask[excite_to_idx[k]],
-                            ]
+                        yield from extend(
+                            k + 1, idx + 1, particles + (a,), code ^ irrep[a]
                         )
-                        if is_spin_allowed and is_excitation and not_touched:
-                            occupied_tmp[excite_from_idx[k]] = virtual[
-                                excite_to_idx[k]
-                            ]
-                        else:
-                            break
-                        if k == n_fold_excitation - 1:
-                            occupied_tmp = sorted(
-                                occupied_tmp, key=self.custom_sort
-                            )
-                            excited_determinants.append(occupied_tmp.copy())
-
-                    # stop criterion for the sum over all virtuals
-                    if excite_to_idx[0] >= n_virt - n_fold_excitation:
-                        break
-                    # obtain next list of indices for next excitation. This
-                    # corresponds excitation to one loop over a n-tuple sum
-                    # over all virtuals.
-                    for a in range(n_fold_excitation - 1, -1, -1):
-                        if excite_to_idx[a] < n_virt - 1 - (
-                            n_fold_excitation - 1 - a
-                        ):
-                            excite_to_idx[a] += 1
-                            for b in range(a + 1, n_fold_excitation):
-                                excite_to_idx[b] = excite_to_idx[b - 1] + 1
-                            break
-                # end of mimicked sum over virtuals
-
-                # stop criterion for the sum over all occupied
-                if excite_from_idx[0] >= n_elec - n_fold_excitation:
-                    done = True
-                    break
-                # obtain next list of indices for next excitation. This corres-
-                # ponds to one loop over a n-tuple sum over all electrons.
-                for i in range(n_fold_excitation - 1, -1, -1):
-                    if excite_from_idx[i] < n_elec - 1 - (
-                        n_fold_excitation - 1 - i
-                    ):
-                        excite_from_idx[i] += 1
-                        for j in range(i + 1, n_fold_excitation):
-                            excite_from_idx[j] = excite_from_idx[j - 1] + 1
-                        break
 
-        # get all demanded excited determinants
-        for excitation in excitations:
-            occ_mask_ini = occ_mask.copy()
-            virt_mask_ini = virt_mask.copy()
-            get_n_fold_excitation(
-                det_ini,
-                virtuals,
-                excitation,
-                occ_mask=occ_mask_ini,
-                virt_mask=virt_mask_ini,
+            yield from extend(0, 0, (), 0)
+
+        def get_particles(holes):
+            """enumerate virtual tuples for excitation of holes"""
+            n_beta = sum(1 for i in holes if i < 0)
+            holes_beta = holes[:n_beta]
+            holes_alpha = holes[n_beta:]
+            required = -1
+            if prune_symmetry:
+                required = 0
+                for i in holes:
+                    required ^= irrep[i]
+            if not holes_alpha:
+                yield from get_spin_particles(holes_beta, 1, required)
+                return
+            for particles_beta in get_spin_particles(holes_beta, 1, -1):
+                required_alpha = required
+                if prune_symmetry:
+                    for a in particles_beta:
+                        required_alpha ^= irrep[a]
+                for particles_alpha in get_spin_particles(
+                    holes_alpha, 0, required_alpha
+                ):
+                    yield particles_beta + particles_alpha
+
+        def get_determinants():
+            """enumerate excited determinants of all excitations"""
+            alpha_ini, beta_ini = self.bitstrings.det2bits(det_ini)
+            # an n-fold excitation can only be demanded once
+            for excitation in dict.fromkeys(excitations):
+                for holes in itertools.combinations(occupied, excitation):
+                    for particles in get_particles(holes):
+                        alpha = alpha_ini
+                        beta = beta_ini
+                        for i, a in zip(holes, particles):
+                            if i > 0:
+                                alpha ^= (1 << (i - 1)) | (1 << (a - 1))
+                            else:
+                                beta ^= (1 << (-i - 1)) | (1 << (-a - 1))
+                        yield self.bitstrings.bits2det(alpha, beta)
+
+        determinants = get_determinants()
+        # remove symmetry forbidden ones
+        if consider_symmetry and not prune_symmetry:
+            determinants = self.screen_determinants(
+                determinants, orbital_symmetry, tot_sym, target_irrep
             )
-            # get_n_fold_excitation_recursive(det_ini, virtuals,
-            # excitation, occ_mask=occ_mask_ini, virt_mask=virt_mask_ini)
-        # remove duplicates
-        excited_determinants = self.spinfuncs.remove_duplicates(
-            excited_determinants
+        if not chunk_size:
+            yield from determinants
+            return
+        chunk = []
+        for determinant in determinants:
+            chunk.append(determinant)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_configurations(
+        self,
+        n_orbitals,
+        excitations,
+        det_ini,
+        orbital_symmetry=[],
+        tot_sym="",
+        det_reference=[],
+        core=[],
+        frozen_MOs=[],
+    ):
+        """generate spatial configurations of all excitations of det_ini,
+        which iter_excitations generates with the same arguments, as
+        bitstrings of doubly and singly occupied orbitals. Each configuration
+        is generated once, but not in the order of iter_excitations.
+
+        For a closed shell initial determinant with spin independent masks,
+        whose excitable electrons are all below the virtual orbitals, the
+        configurations are enumerated directly from spatial holes and
+        particles. Otherwise they are collected from the excited
+        determinants."""
+        alpha_ini, beta_ini = self.bitstrings.det2bits(det_ini)
+        all_orbitals = (1 << n_orbitals) - 1
+        core_bits = self.bitstrings.det2bits(core)
+        frozen_bits = self.bitstrings.det2bits(frozen_MOs)
+        reference_bits = (all_orbitals, all_orbitals)
+        if det_reference:
+            reference_bits = self.bitstrings.det2bits(det_reference)
+        # spin orbitals that can be excited and that can be occupied
+        holes = []
+        particles = []
+        for spin, bits in enumerate((alpha_ini, beta_ini)):
+            holes.append(bits & ~core_bits[spin] & reference_bits[spin])
+            particles.append(all_orbitals & ~bits & ~frozen_bits[spin])
+            if det_reference:
+                particles[spin] &= ~reference_bits[spin]
+        spatial = (
+            alpha_ini == beta_ini
+            and holes[0] == holes[1]
+            and particles[0] == particles[1]
         )
-        # remove spin forbidden ones
-        if consider_symmetry:
-            temp = []
-            for determinant in excited_determinants:
-                symm = self.get_determinant_symmetry(
-                    determinant, orbital_symmetry, tot_sym
+        if spatial and holes[0] and particles[0]:
+            lowest_particle = (particles[0] & -particles[0]).bit_length()
+            spatial = holes[0].bit_length() < lowest_particle
+        if not spatial:
+            yield from self.get_unique_configurations(
+                self.iter_excitations(
+                    n_orbitals,
+                    excitations,
+                    det_ini,
+                    orbital_symmetry=orbital_symmetry,
+                    tot_sym=tot_sym,
+                    det_reference=det_reference,
+                    core=core,
+                    frozen_MOs=frozen_MOs,
+                )
+            )
+            return
+
+        # every virtual orbital is higher than every excitable orbital and
+        # all orbitals are available for both spins, such that the alpha and
+        # beta electrons of each configuration can always be distributed to
+        # conserve the spin. A configuration is therefore an excitation if
+        # the number of removed and added electrons equals the excitation.
+        if orbital_symmetry:
+            symmetry = self.get_character_table(tot_sym)
+            if not symmetry.has_irrep_codes(orbital_symmetry):
+                target_irrep = self.get_target_irrep(
+                    det_ini, orbital_symmetry, tot_sym
                 )
-                if symm == symm_of_det_ini:
-                    temp.append(determinant)
-            excited_determinants = temp
 
-        # add initial determinant, of which excitations have been performed
-        res = excited_determinants
-        return res
+        def get_orbital_sets(orbitals, n_electrons):
+            """enumerate bitstrings of doubly and singly changed orbitals
+            for a change of n_electrons in orbitals"""
+            for n_double in range(n_electrons // 2 + 1):
+                for double in itertools.combinations(orbitals, n_double):
+                    remaining = [i for i in orbitals if i not in double]
+                    double = sum(1 << (i - 1) for i in double)
+                    for single in itertools.combinations(
+                        remaining, n_electrons - 2 * n_double
+                    ):
+                        yield double, sum(1 << (i - 1) for i in single)
+
+        def get_candidates():
+            """enumerate configurations of all excitations"""
+            for excitation in dict.fromkeys(excitations):
+                hole_sets = list(get_orbital_sets(occupied, excitation))
+                for holes_double, holes_single in hole_sets:
+                    doubly_holes = alpha_ini & ~(holes_double | holes_single)
+                    for particles_double, particles_single in get_orbital_sets(
+                        virtuals, excitation
+                    ):
+                        yield (
+                            doubly_holes | particles_double,
+                            holes_single | particles_single,
+                        )
+
+        occupied = self.bitstrings.bits2orbitals(holes[0])
+        virtuals = self.bitstrings.bits2orbitals(particles[0])
+        candidates = get_candidates()
+        if not orbital_symmetry:
+            yield from candidates
+            return
+        # screen blocks of configurations at once by the symmetry of their
+        # determinant with alpha spins in all occupied and beta spins in the
+        # doubly occupied orbitals
+        n_words = self.bitstrings.n_words(n_orbitals)
+        while True:
+            block = list(itertools.islice(candidates, 4096))
+            if not block:
+                return
+            determinants = self.bitstrings.pairs2array(
+                [(doubly | singly, doubly) for doubly, singly in block],
+                n_words,
+            )
+            if symmetry.has_irrep_codes(orbital_symmetry):
+                allowed = (
+                    self.get_determinants_symmetry(
+                        determinants, orbital_symmetry, tot_sym
+                    )
+                    == 0
+                )
+            else:
+                allowed = (
+                    self.get_determinants_irreps(
+                        determinants, orbital_symmetry, tot_sym
+                    )
+                    & target_irrep
+                    != 0
+                )
+            for configuration, is_allowed in zip(block, allowed.tolist()):
+                if is_allowed:
+                    yield configuration
 
     def get_unique_csfs(
         self,
         determinant_basis,
         S,
         M_s,
+        csr=False,
     ):
         """clean determinant basis to obtain unique determinants to
-        construct same csf only once"""
+        construct same csf only once. With csr the csfs are returned as
+        CSFWavefunction."""
+        return self.get_configuration_csfs(
+            self.get_unique_configurations(determinant_basis),
+            S,
+            M_s,
+            csr=csr,
+        )
+
+    def get_unique_configurations(self, determinant_basis):
+        """return unique spatial configurations of determinants in order of
+        first occurrence. The configuration is given by the bitstrings of
+        doubly and singly occupied orbitals."""
+        seen = set()
+        configurations = []
+        for det in determinant_basis:
+            configuration = self.bitstrings.det2config(det)
+            if configuration not in seen:
+                seen.add(configuration)
+                configurations.append(configuration)
+        return configurations
+
+    def get_configuration_csfs(self, configurations, S, M_s, csr=False):
+        """construct csfs of unique spatial configurations given as
+        bitstrings of doubly and singly occupied orbitals"""
         csf_determinants = []
         csf_coefficients = []
-        N = len(determinant_basis[0])
-        # TODO sort determinants in determinant basis
-        for i, _ in enumerate(determinant_basis):
-            determinant_basis[i] = sorted(
-                determinant_basis[i], key=self.custom_sort
-            )
-        # remove spin information and consider only occupation
-        for i, det in enumerate(determinant_basis):
-            for j, orbital in enumerate(det):
-                determinant_basis[i][j] = abs(orbital)
-        # keep only unique determinants
-        seen = set()
-        det_basis_temp = []
-        for sublist in determinant_basis:
-            tuple_sublist = tuple(sublist)
-            if tuple_sublist not in seen:
-                seen.add(tuple_sublist)
-                det_basis_temp.append(sublist)
-
-        det_basis = []
-        # move single SD's that are singulett spin eigenfunctions directly in list csfs
-        # and move all other determinants in det_basis
-        for det in det_basis_temp:
-            if self.is_singulett(det):
+        # move single SD's that are singulett spin eigenfunctions directly in
+        # list csfs and group all other configurations by their number of
+        # open shells. The occupation of a configuration is ordered by
+        # orbitals and each electron is assigned to a column of the spin
+        # template of its group. The spin template holds the primitive spin
+        # functions of all csfs and the spins of the two electrons in a
+        # doubly occupied orbital.
+        groups = {}
+        open_shell_configurations = []
+        for doubly, singly in configurations:
+            if not singly:
                 # add spin again
-                det = [electron * (-1) ** n for n, electron in enumerate(det)]
+                det = []
+                for orbital in self.bitstrings.bits2orbitals(doubly):
+                    det += [orbital, -orbital]
                 csf_determinants.append([det])
                 csf_coefficients.append([1.0])
-            else:
-                det_basis.append(det)
-
-        # add spin for singletts
-        # check which electrons are in a double occupied orbital and mask them
-        masked_electrons = []
-        for determinant in det_basis:
-            mask = []
-            for electron in determinant:
-                if determinant.count(electron) == 2:
-                    mask.append(False)
+                continue
+            n_open = singly.bit_count()
+            occupation = []
+            columns = []
+            n_singly = 0
+            for orbital in self.bitstrings.bits2orbitals(doubly | singly):
+                if doubly >> (orbital - 1) & 1:
+                    occupation += [orbital, orbital]
+                    columns += [n_open, n_open + 1]
                 else:
-                    mask.append(True)
-            masked_electrons.append(mask)
-
-        # generate csf from unique determinant
-        for determinant, mask in zip(det_basis, masked_electrons):
-            n_uncoupled = sum(mask)
+                    occupation.append(orbital)
+                    columns.append(n_singly)
+                    n_singly += 1
+            group = groups.setdefault(n_open, [[], []])
+            open_shell_configurations.append((n_open, len(group[0])))
+            group[0].append(occupation)
+            group[1].append(columns)
+
+        # generate csfs of all configurations of a group at once by applying
+        # the spin template to the occupations
+        group_csfs = {}
+        for n_open, (occupations, columns) in groups.items():
             # get spin eigenfunctions for corresponding determinant
             (
                 geneological_path,
                 primitive_spin_summands,
                 coupling_coefficients,
-            ) = self.spinfuncs.get_all_csfs(n_uncoupled, S, M_s)
-            # form correct determinants
-            # assign psimitive spin to orbitals by element wise multiplication
-            for i, lin_combination in enumerate(primitive_spin_summands):
-                csf_tmp = []
-                for primitive in lin_combination:
-                    idx_primitive = 0
-                    idx_singlet_electron = 0
-                    det_tmp = []
-                    for j, electron in enumerate(determinant):
-                        if mask[j]:
-                            det_tmp.append(electron * primitive[idx_primitive])
-                            idx_primitive += 1
-                        else:
-                            det_tmp.append(
-                                electron * (-1) ** idx_singlet_electron
-                            )
-                            idx_singlet_electron += 1
-                    csf_tmp.append(det_tmp)
+            ) = self.spinfuncs.get_csfs(n_open, S, M_s)
+            template = np.array(
+                [
+                    primitive + [1, -1]
+                    for lin_combination in primitive_spin_summands
+                    for primitive in lin_combination
+                ],
+                dtype=np.int64,
+            ).reshape(-1, n_open + 2)
+            bounds = np.cumsum(
+                [0] + [len(c) for c in primitive_spin_summands]
+            ).tolist()
+            occupations = np.array(occupations, dtype=np.int64)
+            columns = np.array(columns, dtype=np.int64)
+            # bound size of determinant array of a block of configurations
+            n_block = max(1, 2**22 // max(1, template.size))
+            csfs_group = []
+            for start in range(0, len(occupations), n_block):
+                block = slice(start, start + n_block)
+                # assign primitive spin to orbitals by element wise
+                # multiplication
+                determinants = occupations[block, None, :] * np.swapaxes(
+                    template[:, columns[block]], 0, 1
+                )
+                for dets in determinants.tolist():
+                    csfs_group.append(
+                        [
+                            dets[bounds[i] : bounds[i + 1]]
+                            for i in range(len(primitive_spin_summands))
+                        ]
+                    )
+            group_csfs[n_open] = (csfs_group, coupling_coefficients)
+
+        for n_open, row in open_shell_configurations:
+            csfs_group, coupling_coefficients = group_csfs[n_open]
+            for i, csf_tmp in enumerate(csfs_group[row]):
                 csf_determinants.append(csf_tmp)
-                csf_coefficients.append(coupling_coefficients[i])
+                csf_coefficients.append(list(coupling_coefficients[i]))
+        # store newly computed spin couplings
+        self.spinfuncs.save_cache()
+        if csr:
+            return CSFWavefunction().from_lists(
+                csf_coefficients, csf_determinants
+            )
         return csf_coefficients, csf_determinants
 
+    def get_sorted_csfs(self, configurations, S, M_s, workers=1):
+        """construct csfs of unique spatial configurations with determinants
+        sorted in AMOLQC format. With workers > 1 the configurations are
+        split in chunks, whose csfs are built in a process pool."""
+        if workers <= 1:
+            return self.sort_determinants_in_csfs(
+                *self.get_configuration_csfs(configurations, S, M_s)
+            )
+        # closed shell configurations precede all open shell configurations
+        # in the csfs of get_configuration_csfs. Chunking both separately
+        # and concatenating the chunks in input order reproduces the serial
+        # order of the csfs.
+        closed_shells = []
+        open_shells = []
+        for configuration in configurations:
+            if configuration[1]:
+                open_shells.append(configuration)
+            else:
+                closed_shells.append(configuration)
+        chunks = []
+        for configurations_shell in (closed_shells, open_shells):
+            # distribute several chunks per worker for load balancing
+            chunk_size = max(1, -(-len(configurations_shell) // (4 * workers)))
+            chunks += [
+                configurations_shell[start : start + chunk_size]
+                for start in range(0, len(configurations_shell), chunk_size)
+            ]
+        # compute spin couplings in this process, such that the workers take
+        # them from the cache and only this process writes the cache file
+        for n_open in sorted(
+            {singly.bit_count() for _, singly in open_shells}
+        ):
+            self.spinfuncs.get_csfs(n_open, S, M_s)
+        self.spinfuncs.save_cache()
+        # this SelectedCI with its spin couplings is sent once per worker,
+        # the tasks only send their chunk of configurations
+        build = functools.partial(self.get_sorted_csfs, S=S, M_s=M_s)
+        csf_coefficients = []
+        csfs = []
+        with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=init_worker, initargs=(build,)
+        ) as pool:
+            for chunk_coefficients, chunk_csfs in pool.map(run_worker, chunks):
+                csf_coefficients += chunk_coefficients
+                csfs += chunk_csfs
+        return csf_coefficients, csfs
+
     def get_initial_wf(
         self,
         S,
@@ -866,43 +1910,74 @@ to parse CSF energy contributions."
         filename,
         split_at=0,
         sort_option="",
+        configuration_space=False,
+        workers=1,
         verbose=False,
     ):
-        """get initial wave function for selected Configuration Interaction in Amolqc format."""
+        """get initial wave function for selected Configuration Interaction in Amolqc format.
+        With configuration_space the excitations are performed on spatial
+        configurations instead of determinants, which changes the order of
+        the csfs but not the wave function. With workers > 1 the csfs are
+        built in a process pool."""
         N = len(initial_determinant)
-        determinant_basis = []
 
-        # get excitation determinants from ground state HF determinant
         time1 = time.time()
-        excited_determinants = self.get_excitations(
-            n_MO,
-            excitations,
-            initial_determinant,
-            orbital_symmetry=orbital_symmetry,
-            tot_sym=total_symmetry,
-            core=frozen_elecs,
-            frozen_MOs=frozen_MOs,
-        )
+        if configuration_space:
+            # get excited configurations from ground state HF determinant
+            excited_configurations = self.iter_configurations(
+                n_MO,
+                excitations,
+                initial_determinant,
+                orbital_symmetry=orbital_symmetry,
+                tot_sym=total_symmetry,
+                core=frozen_elecs,
+                frozen_MOs=frozen_MOs,
+            )
+            configurations = dict.fromkeys(
+                itertools.chain(
+                    [self.bitstrings.det2config(initial_determinant)],
+                    excited_configurations,
+                )
+            )
+        else:
+            # get excitation determinants from ground state HF determinant.
+            # The excitations are generated lazily and directly consumed by
+            # the formation of csfs.
+            excited_determinants = self.iter_excitations(
+                n_MO,
+                excitations,
+                initial_determinant,
+                orbital_symmetry=orbital_symmetry,
+                tot_sym=total_symmetry,
+                core=frozen_elecs,
+                frozen_MOs=frozen_MOs,
+            )
+            # the determinants are counted while they are consumed
+            n_determinants = itertools.count()
+            determinant_basis = (
+                det
+                for det, _ in zip(
+                    itertools.chain(
+                        [initial_determinant], excited_determinants
+                    ),
+                    n_determinants,
+                )
+            )
+            configurations = self.get_unique_configurations(determinant_basis)
         print(f"time to obtain all excitations: {time.time()-time1}")
-        determinant_basis += [initial_determinant]
-        determinant_basis += excited_determinants
-        if verbose:
-            print(f"number of determinant basis: {len(determinant_basis)}")
+        if verbose and not configuration_space:
+            print(f"number of determinant basis: {next(n_determinants)}")
             print()
 
-        # form csfs from determinants in determinant basis
-        csf_coefficients, csfs = self.get_unique_csfs(
-            determinant_basis, S, M_s
+        # form csfs from configurations and sort determinants to obtain
+        # AMOLQC format
+        csf_coefficients, csfs = self.get_sorted_csfs(
+            list(configurations), S, M_s, workers=workers
         )
         if verbose:
             print(f"number of csfs {len(csf_coefficients)}")
             print()
 
-        # sort determinants to obtain AMOLQC format
-        csf_coefficients, csfs = self.sort_determinants_in_csfs(
-            csf_coefficients, csfs
-        )
-
         # generate MO initial list
         CI_coefficients = [1 if n == 0 else 0 for n in range(len(csfs))]
         if sort_option != "":
@@ -917,31 +1992,28 @@ to parse CSF energy contributions."
         # read wave function pretext from already generated wavefunction
         wfpretext = ""
         try:
-            _, _, _, wfpretext = self.read_AMOLQC_csfs(f"{filename}.wf", N)
+            wfpretext = self.open_AMOLQC(f"{filename}.wf", N).pretext()
         except:
             FileNotFoundError
         if split_at > 0:
             # prints csfs inlcusive the indice of split at in first wf and residual in second
-            self.write_AMOLQC(
-                csf_coefficients[:split_at],
-                csfs[:split_at],
-                CI_coefficients[:split_at],
-                pretext=wfpretext,
-                file_name=f"{filename}_out.wf",
-            )
-            self.write_AMOLQC(
-                csf_coefficients[split_at:],
-                csfs[split_at:],
-                CI_coefficients[split_at:],
-                file_name=f"{filename}_res.wf",
+            n_csfs = self.write_AMOLQC_partitioned(
+                csf_coefficients,
+                csfs,
+                CI_coefficients,
+                [f"{filename}_out.wf", f"{filename}_res.wf"],
+                split_at=[split_at],
+                options=[
+                    {"pretext": wfpretext},
+                    {
+                        "binary": self.internal_format == "binary",
+                        "compression": self.internal_compression,
+                    },
+                ],
             )
             if verbose:
-                print(
-                    f"number of csfs in wf 1: {len(csf_coefficients[:split_at])}"
-                )
-                print(
-                    f"number of csfs in wf 2: {len(csf_coefficients[split_at:])}"
-                )
+                print(f"number of csfs in wf 1: {n_csfs[0]}")
+                print(f"number of csfs in wf 2: {n_csfs[1]}")
                 print()
         else:
             # write wavefunction in AMOLQC format
@@ -953,6 +2025,90 @@ to parse CSF energy contributions."
                 file_name=f"{filename}_out.wf",
             )
 
+    def excite_determinants(
+        self,
+        determinants: list,
+        n_MO: int,
+        excitations: list,
+        reference_determinant: list,
+        orbital_symmetry: list,
+        total_symmetry: str,
+        frozen_elecs: list,
+        frozen_MOs: list,
+        start=0,
+        stop=None,
+    ):
+        """do n-fold excitations of determinants[start:stop] and return the
+        excited determinants without duplicates in order of first
+        occurrence."""
+        seen = set()
+        res = []
+        for det in determinants[start:stop]:
+            for det_excited in self.iter_excitations(
+                n_MO,
+                excitations,
+                det,
+                det_reference=reference_determinant,
+                orbital_symmetry=orbital_symmetry,
+                tot_sym=total_symmetry,
+                core=frozen_elecs,
+                frozen_MOs=frozen_MOs,
+            ):
+                det_bits = self.bitstrings.det2bits(det_excited)
+                if det_bits not in seen:
+                    res.append(det_excited)
+                    seen.add(det_bits)
+        return res
+
+    def get_csf_configurations(self, csfs):
+        """return set of spatial configurations of csfs. All determinants of
+        a csf have the same configuration, such that only the first
+        determinant is required."""
+        return {self.bitstrings.det2config(csf[0]) for csf in csfs}
+
+    def get_file_stamp(self, filename, n_csfs):
+        """return stamp of a file of n_csfs csfs, which consists of its size
+        and the number of csfs. The file is not read, such that the stamp
+        is cheap for large files. Returns None if the file does not
+        exist."""
+        try:
+            return [os.path.getsize(filename), n_csfs]
+        except FileNotFoundError:
+            return None
+
+    def read_visited_configurations(self, filename, discarded_stamp):
+        """read visited configurations, which have been written together
+        with the file of discarded csfs with stamp discarded_stamp of
+        get_file_stamp. Returns None if the file does not exist or belongs
+        to different discarded csfs."""
+        if discarded_stamp is None:
+            return None
+        try:
+            with np.load(filename) as data:
+                if data["discarded_stamp"].tolist() != discarded_stamp:
+                    return None
+                return set(
+                    self.bitstrings.array2pairs(data["configurations"])
+                )
+        except (FileNotFoundError, KeyError):
+            return None
+
+    def write_visited_configurations(
+        self, filename, configurations, discarded_stamp, n_orbitals
+    ):
+        """write visited configurations as uint64 array of doubly and singly
+        occupied orbitals together with the stamp of the file of discarded
+        csfs"""
+        for doubly, singly in configurations:
+            n_orbitals = max(n_orbitals, (doubly | singly).bit_length())
+        np.savez(
+            filename,
+            configurations=self.bitstrings.pairs2array(
+                list(configurations), self.bitstrings.n_words(n_orbitals)
+            ),
+            discarded_stamp=np.array(discarded_stamp, dtype=np.int64),
+        )
+
     def select_and_do_excitations(
         self,
         N: int,
@@ -974,10 +2130,12 @@ to parse CSF energy contributions."
         threshold_type="cut_at",
         split_at=0,
         use_optimized_CI_coeffs=True,
+        workers=1,
         verbose=False,
     ):
         """select csfs by size of their coefficients and do n-fold
-        excitations of determinants in selected csfs."""
+        excitations of determinants in selected csfs. With workers > 1 the
+        excitations and csfs are built in a process pool."""
         assert (
             criterion == "energy" or criterion == "ci_coefficient"
         ), "Criterion has to be energy or ci_coefficient."
@@ -1002,6 +2160,16 @@ is going to be generated for this selection."
             )
             print()
 
+        # configurations of all csfs discarded in previous iterations
+        visited = self.read_visited_configurations(
+            f"{filename_discarded_all}_visited.npz",
+            self.get_file_stamp(
+                f"{filename_discarded_all}.wf", len(csfs_discarded_all)
+            ),
+        )
+        if visited is None:
+            visited = self.get_csf_configurations(csfs_discarded_all)
+
         energies_discarded_all = []
         if criterion == "energy":
             _, energies_discarded_all = self.parse_csf_energies(
@@ -1116,22 +2284,28 @@ wavefunction {len(csfs_optimized)}"
             CI_coefficients_discarded_all,
             energies=energies_discarded_all,
             file_name=f"{filename_optimized}_dis_out.wf",
+            binary=self.internal_format == "binary",
+            compression=self.internal_compression,
         )
 
-        # expand cut csfs in determinants
-        _, _, determinant_basis_discarded = self.get_transformation_matrix(
-            csf_coefficients_discarded_all,
-            csfs_discarded_all,
-            CI_coefficients_discarded_all,
+        # visited configurations are stored next to the file of discarded
+        # csfs. They are only updated by the csfs that are discarded or
+        # selected in this iteration.
+        visited |= self.get_csf_configurations(csfs_discarded)
+        visited |= self.get_csf_configurations(csfs_selected)
+        self.write_visited_configurations(
+            f"{filename_optimized}_dis_out_visited.npz",
+            visited,
+            self.get_file_stamp(
+                f"{filename_optimized}_dis_out.wf", len(csfs_discarded_all)
+            ),
+            n_MO,
         )
 
         # expand selected csfs in determinants
         _, _, determinant_basis_selected = self.get_transformation_matrix(
             csf_coefficients_selected, csfs_selected, CI_coefficients_selected
         )
-        determinants_already_visited = (
-            determinant_basis_selected + determinant_basis_discarded
-        )
         # determine excitation with respect to reference determinant
         n_tuple_excitation = self.determine_excitations(
             determinant_basis_selected, reference_determinant, "det"
@@ -1142,56 +2316,64 @@ wavefunction {len(csfs_optimized)}"
         # determinant_basis_selected = [
         #    determinant_basis_selected[i] for i in idx
         # ]
-        excitation_input = []
-        for i, exc in enumerate(n_tuple_excitation):
-            if exc in excitations_on:
-                excitation_input.append(determinant_basis_selected[i])
+        excite_on = np.isin(n_tuple_excitation, excitations_on)
+        excitation_input = [
+            det for det, on in zip(determinant_basis_selected, excite_on) if on
+        ]
 
         # do exitations from selected determinants. only excite electrons that
         # have not yet been excited with respect to the reference determinant
         # (initial input determinant)
-        excited_determinants = []
-        for det in excitation_input:
-            determinants = self.get_excitations(
-                n_MO,
-                excitations,
-                det,
-                det_reference=reference_determinant,
-                orbital_symmetry=orbital_symmetry,
-                tot_sym=total_symmetry,
-                core=frozen_elecs,
-                frozen_MOs=frozen_MOs,
-            )
-            excited_determinants += determinants
-        excited_determinants = self.spinfuncs.remove_duplicates(
-            excited_determinants
+        # remove determinants of configurations that have already been
+        # visited and are found in the input wave function. Duplicates of
+        # determinants that can be generated from several selected
+        # determinants are removed.
+        excite = functools.partial(
+            self.excite_determinants,
+            n_MO=n_MO,
+            excitations=excitations,
+            reference_determinant=reference_determinant,
+            orbital_symmetry=orbital_symmetry,
+            total_symmetry=total_symmetry,
+            frozen_elecs=frozen_elecs,
+            frozen_MOs=frozen_MOs,
         )
-
-        # remove determinants that have already been visited and are
-        # found in the input wave function
-        seen = set()
-        for det in determinants_already_visited:
-            det = sorted(det, key=self.custom_sort)
-            seen.add(tuple(det))
-        res = []
-        for det in excited_determinants:
-            # Convert sublist to tuple
-            det = sorted(det, key=self.custom_sort)
-            det_tuple = tuple(det)
-            if det_tuple not in seen:
-                res.append(det)
-                seen.add(det_tuple)
-        excited_determinants = res
+        if workers > 1 and len(excitation_input) > 1:
+            # distribute several chunks per worker for load balancing.
+            # Duplicates are removed within each chunk by the workers and
+            # across chunks while merging. pool.map returns chunks in input
+            # order, which keeps the merged excitations deterministic. Each
+            # task only sends its chunk, the remaining arguments are sent
+            # once per worker.
+            chunk_size = -(-len(excitation_input) // (4 * workers))
+            chunks = [
+                excitation_input[start : start + chunk_size]
+                for start in range(0, len(excitation_input), chunk_size)
+            ]
+            with concurrent.futures.ProcessPoolExecutor(
+                workers, initializer=init_worker, initargs=(excite,)
+            ) as pool:
+                chunks_excited = list(pool.map(run_worker, chunks))
+            excited_determinants = self.bitstrings.remove_duplicates(
+                itertools.chain.from_iterable(chunks_excited)
+            )
+        else:
+            excited_determinants = excite(excitation_input)
+        excited_determinants = [
+            det_excited
+            for det_excited in excited_determinants
+            if self.bitstrings.det2config(det_excited) not in visited
+        ]
         if verbose:
             print(
                 f"number determinants to form csfs: {len(excited_determinants)}"
             )
         # form csfs of these determinants
-        csf_coefficients, csfs = self.get_unique_csfs(
-            excited_determinants, S, M_s
-        )
-        csf_coefficients, csfs = self.sort_determinants_in_csfs(
-            csf_coefficients, csfs
+        csf_coefficients, csfs = self.get_sorted_csfs(
+            self.get_unique_configurations(excited_determinants),
+            S,
+            M_s,
+            workers=workers,
         )
         if verbose:
             print(f"number of newly generated csfs: {len(csf_coefficients)}")
@@ -1220,28 +2402,29 @@ wavefunction {len(csfs_optimized)}"
         # write wavefunction in AMOLQC format
         if split_at > 0:
             # prints csfs inlcusive the indice of split at in first wf and residual in second
-            self.write_AMOLQC(
-                csf_coefficients[:split_at],
-                csfs[:split_at],
-                CI_coefficients[:split_at],
-                pretext=wfpretext,
-                file_name=f"{filename_optimized}_out.wf",
-            )
-            self.write_AMOLQC(
-                csf_coefficients[split_at:],
-                csfs[split_at:],
-                CI_coefficients[split_at:],
-                file_name=f"{filename_optimized}_res_out.wf",
+            n_csfs = self.write_AMOLQC_partitioned(
+                csf_coefficients,
+                csfs,
+                CI_coefficients,
+                [
+                    f"{filename_optimized}_out.wf",
+                    f"{filename_optimized}_res_out.wf",
+                ],
+                split_at=[split_at],
+                options=[
+                    {"pretext": wfpretext},
+                    {
+                        "binary": self.internal_format == "binary",
+                        "compression": self.internal_compression,
+                    },
+                ],
             )
             if verbose:
                 print(
                     f"number of csfs in next iteration wf: \
 {len(csf_coefficients_optimized[:split_at])}"
                 )
-                print(
-                    f"number of csfs in residual wf: \
-{len(csf_coefficients[split_at:])}"
-                )
+                print(f"number of csfs in residual wf: {n_csfs[1]}")
                 print()
         else:
             # write wavefunction in AMOLQC format
@@ -1480,26 +2663,26 @@ is going to be generated for this selection."
             if len(csfs_selected) > split_at:
                 n_cut = len(csfs_selected) + n_expand
 
-            self.write_AMOLQC(
-                csf_coefficients[:n_cut],
-                csfs[:n_cut],
-                CI_coefficients[:n_cut],
-                pretext=wfpretext,
-                file_name=f"{filename_optimized}_out.wf",
-            )
-            self.write_AMOLQC(
-                csf_coefficients[n_cut:],
-                csfs[n_cut:],
-                CI_coefficients[n_cut:],
-                file_name=f"{filename_residual}_out.wf",
+            n_csfs = self.write_AMOLQC_partitioned(
+                csf_coefficients,
+                csfs,
+                CI_coefficients,
+                [
+                    f"{filename_optimized}_out.wf",
+                    f"{filename_residual}_out.wf",
+                ],
+                split_at=[n_cut],
+                options=[
+                    {"pretext": wfpretext},
+                    {
+                        "binary": self.internal_format == "binary",
+                        "compression": self.internal_compression,
+                    },
+                ],
             )
             if verbose:
-                print(
-                    f"number of csfs in next iteration wf: {len(csf_coefficients[:n_cut])}"
-                )
-                print(
-                    f"number of csfs in residual wf: {len(csf_coefficients[:n_cut])}"
-                )
+                print(f"number of csfs in next iteration wf: {n_csfs[0]}")
+                print(f"number of csfs in residual wf: {n_csfs[1]}")
                 print()
         # else:
         #    # write wavefunction in AMOLQC format
@@ -1516,6 +2699,8 @@ is going to be generated for this selection."
             CI_coefficients_discarded_all,
             energies=energies_discarded_all,
             file_name=f"{filename_discarded_all}_out.wf",
+            binary=self.internal_format == "binary",
+            compression=self.internal_compression,
         )
 
         # print info file
@@ -0,0 +1,270 @@
+from array import array
+import numpy as np
+
+
+class CSFWavefunction:
+    """csf wave function in compressed sparse row format.
+
+    The determinants and coupling coefficients of csf i are given by the
+    entries offsets[i] to offsets[i+1] of det_ids and coefficients. det_ids
+    are row indices of the shared determinant table determinants, which
+    stores each determinant once in the signed-int representation."""
+
+    def __init__(self):
+        self.CI_coefficients = np.zeros(0)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.coefficients = np.zeros(0)
+        self.det_ids = np.zeros(0, dtype=np.int32)
+        self.determinants = np.zeros((0, 0), dtype=np.int16)
+        self.energies = np.zeros(0)
+        # first bytes of files in binary format
+        self.magic = b"WFMODCSF"
+        self.version = 1
+
+    def n_csfs(self):
+        """number of csfs in wave function"""
+        return len(self.offsets) - 1
+
+    def nbytes(self):
+        """memory of all arrays in bytes"""
+        return (
+            self.CI_coefficients.nbytes
+            + self.offsets.nbytes
+            + self.coefficients.nbytes
+            + self.det_ids.nbytes
+            + self.determinants.nbytes
+            + self.energies.nbytes
+        )
+
+    def from_csfs(self, csfs):
+        """build wave function from iterable of (CI coefficient, coupling
+        coefficients, determinants) of each csf. The iterable is consumed
+        lazily, such that no nested lists of the full wave function are
+        required."""
+        CI_coefficients = array("d")
+        offsets = array("q", [0])
+        coefficients = array("d")
+        det_ids = array("q")
+        determinants = array("i")
+        det_index = {}
+        n_elec = 0
+        for CI_coefficient, csf_coefficients, csf in csfs:
+            CI_coefficients.append(CI_coefficient)
+            coefficients.extend(csf_coefficients)
+            for det in csf:
+                det = tuple(det)
+                if det not in det_index:
+                    det_index[det] = len(det_index)
+                    determinants.extend(det)
+                    n_elec = len(det)
+                det_ids.append(det_index[det])
+            offsets.append(len(det_ids))
+        return self.from_arrays(
+            np.frombuffer(CI_coefficients, dtype=np.float64),
+            np.frombuffer(offsets, dtype=np.int64),
+            np.frombuffer(coefficients, dtype=np.float64),
+            np.frombuffer(det_ids, dtype=np.int64),
+            np.frombuffer(determinants, dtype=np.int32).reshape(
+                len(det_index), n_elec
+            ),
+        )
+
+    def from_arrays(
+        self, CI_coefficients, offsets, coefficients, det_ids, determinants
+    ):
+        """build wave function from arrays in csr format"""
+        assert len(coefficients) == len(
+            det_ids
+        ), "number of coefficients and determinants differ."
+        assert (
+            len(offsets) == len(CI_coefficients) + 1
+        ), "number of offsets and csfs differ."
+        self.CI_coefficients = np.asarray(CI_coefficients, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.det_ids = np.asarray(det_ids, dtype=np.int64)
+        self.determinants = np.asarray(determinants, dtype=np.int32)
+        # use smallest integer types that can store the entries
+        if len(self.determinants) < 2**31:
+            self.det_ids = self.det_ids.astype(np.int32)
+        if (
+            not self.determinants.size
+            or np.abs(self.determinants).max() < 2**15
+        ):
+            self.determinants = self.determinants.astype(np.int16)
+        return self
+
+    def from_determinants(
+        self, CI_coefficients, offsets, coefficients, determinants
+    ):
+        """build wave function from array of all determinants of all csfs
+        of shape (n_summands, n_elec). Each determinant is stored once in
+        order of first occurrence."""
+        determinants = np.asarray(determinants)
+        unique, first, inverse = np.unique(
+            determinants, axis=0, return_index=True, return_inverse=True
+        )
+        order = np.argsort(first)
+        det_ids = np.empty(len(order), dtype=np.int64)
+        det_ids[order] = np.arange(len(order))
+        return self.from_arrays(
+            CI_coefficients,
+            offsets,
+            coefficients,
+            det_ids[inverse.reshape(-1)],
+            unique[order],
+        )
+
+    def from_lists(self, csf_coefficients, csfs, CI_coefficients=[]):
+        """build wave function from nested lists of coupling coefficients
+        and determinants"""
+        if not len(CI_coefficients):
+            CI_coefficients = [0.0 for _ in range(len(csfs))]
+        return self.from_csfs(zip(CI_coefficients, csf_coefficients, csfs))
+
+    def get_csf(self, i):
+        """return coupling coefficients and determinants of csf i"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return (
+            self.coefficients[start:end].tolist(),
+            self.determinants[self.det_ids[start:end]].tolist(),
+        )
+
+    def iter_csfs(self):
+        """iterate over (CI coefficient, coupling coefficients,
+        determinants) of all csfs"""
+        for i, CI_coefficient in enumerate(self.CI_coefficients.tolist()):
+            yield (CI_coefficient, *self.get_csf(i))
+
+    def to_lists(self):
+        """return nested lists of coupling coefficients, determinants and
+        list of CI coefficients"""
+        coefficients = self.coefficients.tolist()
+        determinants = self.determinants[self.det_ids].tolist()
+        offsets = self.offsets.tolist()
+        csf_coefficients = []
+        csfs = []
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            csf_coefficients.append(coefficients[start:end])
+            csfs.append(determinants[start:end])
+        return csf_coefficients, csfs, self.CI_coefficients.tolist()
+
+    def get_csfs(self, indices):
+        """return wave function of csfs with given indices. The determinant
+        table is shared with this wave function."""
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.offsets[indices]
+        n_summands = self.offsets[indices + 1] - starts
+        offsets = np.concatenate(([0], np.cumsum(n_summands)))
+        positions = np.repeat(starts - offsets[:-1], n_summands)
+        positions += np.arange(offsets[-1])
+        wavefunction = CSFWavefunction()
+        wavefunction.CI_coefficients = self.CI_coefficients[indices]
+        wavefunction.offsets = offsets
+        wavefunction.coefficients = self.coefficients[positions]
+        wavefunction.det_ids = self.det_ids[positions]
+        wavefunction.determinants = self.determinants
+        return wavefunction
+
+    def is_binary(self, filename):
+        """check if file contains a wave function in binary format"""
+        try:
+            with open(filename, "rb") as f:
+                return f.read(len(self.magic)) == self.magic
+        except (FileNotFoundError, IsADirectoryError):
+            return False
+
+    def get_binary_layout(self, header):
+        """return byte offset of the pretext and list of name, dtype, shape
+        and byte offset of all arrays in a binary file with given header"""
+        (
+            _,
+            _,
+            n_csfs,
+            n_summands,
+            n_dets,
+            n_elec,
+            n_energies,
+            n_pretext,
+            det_id_size,
+            determinant_size,
+        ) = header.tolist()
+        arrays = [
+            ("CI_coefficients", "<f8", (n_csfs,)),
+            ("offsets", "<i8", (n_csfs + 1,)),
+            ("coefficients", "<f8", (n_summands,)),
+            ("det_ids", f"<i{det_id_size}", (n_summands,)),
+            ("determinants", f"<i{determinant_size}", (n_dets, n_elec)),
+            ("energies", "<f8", (n_energies,)),
+        ]
+        # all sections start at multiples of 8 bytes
+        offset = len(self.magic) + header.nbytes
+        pretext_offset = offset
+        offset += -(-n_pretext // 8) * 8
+        layout = []
+        for name, dtype, shape in arrays:
+            layout.append((name, dtype, shape, offset))
+            size = np.dtype(dtype).itemsize * int(np.prod(shape))
+            offset += -(-size // 8) * 8
+        return pretext_offset, layout
+
+    def write_binary(self, filename, pretext="", wftype="csf"):
+        """write wave function in binary format. The file consists of the
+        magic bytes, a header with the sizes of all sections, the pretext
+        and the arrays of the wave function."""
+        pretext = pretext.encode()
+        header = np.array(
+            [
+                self.version,
+                wftype == "det",
+                self.n_csfs(),
+                len(self.coefficients),
+                len(self.determinants),
+                self.determinants.shape[1],
+                len(self.energies),
+                len(pretext),
+                self.det_ids.dtype.itemsize,
+                self.determinants.dtype.itemsize,
+            ],
+            dtype="<i8",
+        )
+        pretext_offset, layout = self.get_binary_layout(header)
+        with open(filename, "wb") as f:
+            f.write(self.magic)
+            f.write(header.tobytes())
+            f.write(pretext)
+            for name, dtype, _, offset in layout:
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(np.ascontiguousarray(getattr(self, name), dtype).data)
+
+    def read_binary(self, filename, mmap=True):
+        """read wave function in binary format. With mmap the arrays are
+        memory mapped read only instead of loaded. Returns the pretext and
+        the wave function type."""
+        with open(filename, "rb") as f:
+            assert (
+                f.read(len(self.magic)) == self.magic
+            ), f"{filename} is not a wave function in binary format."
+            header = np.frombuffer(f.read(10 * 8), dtype="<i8")
+            assert (
+                header[0] == self.version
+            ), f"version {header[0]} of binary wave function is unknown."
+            pretext_offset, layout = self.get_binary_layout(header)
+            f.seek(pretext_offset)
+            pretext = f.read(int(header[7])).decode()
+            for name, dtype, shape, offset in layout:
+                if mmap and np.prod(shape):
+                    array = np.memmap(
+                        filename,
+                        dtype=dtype,
+                        mode="r",
+                        offset=offset,
+                        shape=shape,
+                    )
+                else:
+                    f.seek(offset)
+                    array = np.fromfile(
+                        f, dtype=dtype, count=int(np.prod(shape))
+                    ).reshape(shape)
+                setattr(self, name, array)
+        return pretext, "det" if header[1] else "csf"
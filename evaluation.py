@@ -34,11 +34,8 @@ class Evaluation:
         color = []
         ref_state = self.sCI.build_energy_lowest_detetminant(n_elec)
         # color ci points by respective excitation
-        for csf in csfs:
-            difference = 0
-            for electron in csf[0]:
-                if electron not in ref_state:
-                    difference += 1
+        excitations = self.sCI.determine_excitations(csfs, ref_state, "csf")
+        for difference in excitations:
             if difference == 1:
                 color.append("red")
             elif difference == 2:
@@ -92,11 +89,8 @@ class Evaluation:
         color = []
         ref_state = self.sCI.build_energy_lowest_detetminant(n_elec)
 
-        for csf in csfs:
-            difference = 0
-            for electron in csf[0]:
-                if electron not in ref_state:
-                    difference += 1
+        excitations = self.sCI.determine_excitations(csfs, ref_state, "csf")
+        for difference in excitations:
             if difference == 1:
                 color.append("red")
             elif difference == 2:
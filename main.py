@@ -40,6 +40,7 @@ def main():
             "pointGroup": "",
             "quantumNumber_S": 0,
             "quantumNumber_Ms": 0,
+            "stateSymmetry": "",
         },
         "WavefunctionOptions": {
             "wavefunctionName": "sCI",
@@ -51,6 +52,10 @@ def main():
             "splitAt": 0,
             "maxCsfs": 1500,
             "wfType": "csf",
+            "spinCouplingCache": "",
+            "configurationSpace": False,
+            "internalFormat": "text",
+            "compressInternal": "",
         },
         "Output": {
             "plotCICoefficients": False,
@@ -69,7 +74,7 @@ def main():
             "energyAMI": "",
             "keepAllSingles": False,
         },
-        "Hardware": {"partition": "p16", "nTasks": "144"},
+        "Hardware": {"partition": "p16", "nTasks": "144", "workers": 1},
     }
 
     # load input in data
@@ -91,6 +96,7 @@ def main():
     M_s = data["MoleculeInformation"]["quantumNumber_Ms"]
     point_group = data["MoleculeInformation"]["pointGroup"]
     orbital_symmetry = data["MoleculeInformation"]["orbitalSymmetries"]
+    state_symmetry = data["MoleculeInformation"]["stateSymmetry"]
 
     wavefunction_name = data["WavefunctionOptions"]["wavefunctionName"]
     excitations = data["WavefunctionOptions"]["excitations"]
@@ -100,6 +106,10 @@ def main():
     sort = data["WavefunctionOptions"]["sort"]
     max_csfs = data["WavefunctionOptions"]["maxCsfs"]
     wftype = data["WavefunctionOptions"]["wfType"]
+    spin_coupling_cache = data["WavefunctionOptions"]["spinCouplingCache"]
+    configuration_space = data["WavefunctionOptions"]["configurationSpace"]
+    internal_format = data["WavefunctionOptions"]["internalFormat"]
+    internal_compression = data["WavefunctionOptions"]["compressInternal"]
 
     criterion = data["Specifications"]["criterion"]
     threshold = float(data["Specifications"]["threshold"])
@@ -113,8 +123,31 @@ def main():
     final_ami = data["Specifications"]["finalAMI"]
     keep_all_singles = data["Specifications"]["keepAllSingles"]
 
+    # reuse spin couplings of previous runs
+    if spin_coupling_cache:
+        sCI.spinfuncs.load_cache(spin_coupling_cache)
+    # irrep of the electronic state for degenerate irreps
+    sCI.state_symmetry = state_symmetry
+    # intermediate wave functions can be stored in binary format
+    assert internal_format in (
+        "text",
+        "binary",
+    ), "internalFormat has to be text or binary."
+    sCI.internal_format = internal_format
+    # intermediate wave functions in text format can be compressed
+    assert internal_compression in (
+        "",
+        "gz",
+        "xz",
+    ), "compressInternal has to be gz or xz."
+    assert (
+        not internal_compression or internal_format == "text"
+    ), "only intermediate wave functions in text format can be compressed."
+    sCI.internal_compression = internal_compression
+
     partition = data["Hardware"]["partition"]
     n_tasks = data["Hardware"]["nTasks"]
+    workers = data["Hardware"]["workers"]
 
     auto = Automation(
         wavefunction_name,
@@ -139,6 +172,12 @@ def main():
         threshold_type,
         keep_all_singles,
         max_csfs,
+        workers=workers,
+        spin_coupling_cache=spin_coupling_cache,
+        configuration_space=configuration_space,
+        internal_format=internal_format,
+        internal_compression=internal_compression,
+        state_symmetry=state_symmetry,
     )
     evaluation = Evaluation()
     utils = Utils()
@@ -159,6 +198,8 @@ def main():
             wavefunction_name,
             split_at=split_at,
             sort_option=sort,
+            configuration_space=configuration_space,
+            workers=workers,
             verbose=True,
         )
 
@@ -215,9 +256,26 @@ def main():
 
     elif data["WavefunctionOptions"]["wavefunctionOperation"] == "cut":
         # read wf and cut by split_at
-        csf_coefficients, csfs, CI_coefficients, wfpretext = (
-            sCI.read_AMOLQC_csfs(f"{wavefunction_name}.wf", N)
-        )
+        wavefunction_file = sCI.open_AMOLQC(f"{wavefunction_name}.wf", N)
+        wfpretext = wavefunction_file.pretext()
+        if criterion == "energy" or criterion == "by_excitation":
+            # sorting requires all csfs
+            csf_coefficients, csfs, CI_coefficients, _ = (
+                sCI.read_AMOLQC_csfs(f"{wavefunction_name}.wf", N)
+            )
+        elif criterion == "ci_coefficient":
+            # sort by CI coefficient and read only the csfs that are kept
+            print("Sort wave function by absolute CI coefficient.")
+            CI_coefficients = wavefunction_file.CI_coefficients()
+            order = (-1 * np.abs(CI_coefficients)).argsort()
+            csf_coefficients, csfs, CI_coefficients = wavefunction_file[
+                order[:split_at]
+            ]
+        else:
+            csf_coefficients, csfs, CI_coefficients = wavefunction_file[
+                :split_at
+            ]
+
         if criterion == "energy":
             indices, energies, errors = sCI.parse_csf_energies(
                 f"{energy_ami}.amo",
@@ -249,15 +307,6 @@ def main():
                 side=-1,
                 absol=False,
             )
-        elif criterion == "ci_coefficient":
-            # sort by CI coefficient
-            print("Sort wave function by absolute CI coefficient.")
-            csf_coefficients, csfs, CI_coefficients = sCI.sort_lists_by_list(
-                [csf_coefficients, csfs, CI_coefficients],
-                CI_coefficients,
-                side=-1,
-                absol=True,
-            )
         elif criterion == "by_excitation":
             ref_determinant = sCI.build_energy_lowest_detetminant(N)
             # sort by CI coefficient
@@ -411,6 +460,7 @@ def main():
             threshold,
             max_csfs,
             threshold_type=threshold_type,
+            workers=workers,
             verbose=True,
         )
 
@@ -427,6 +477,7 @@ def main():
             frozen_MOs,
             wavefunction_name,
             wftype,
+            workers=workers,
         )
 
     elif data["WavefunctionOptions"]["wavefunctionOperation"] == "read_cipsi":
@@ -447,9 +498,11 @@ def main():
 
         # get csfs from determinant basis and print wavefunction.
         # create guess for CI coefficients
-        csf_coefficients, csfs = sCI.get_unique_csfs(determinants, S, M_s)
-        csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
-            csf_coefficients, csfs
+        csf_coefficients, csfs = sCI.get_sorted_csfs(
+            sCI.get_unique_configurations(determinants),
+            S,
+            M_s,
+            workers=workers,
         )
         ci_csf_coefficients = [1 if n == 0 else 0 for n in range(len(csfs))]
 
@@ -469,6 +522,21 @@ def main():
         )
         print(len(determinant_basis_csfs))
 
+    elif data["WavefunctionOptions"]["wavefunctionOperation"] == "wf2binary":
+        # convert AMOLQC text file in binary format
+        sCI.convert_AMOLQC(
+            f"{wavefunction_name}.wf", f"{wavefunction_name}_out.wf", N
+        )
+
+    elif data["WavefunctionOptions"]["wavefunctionOperation"] == "binary2wf":
+        # convert binary file in AMOLQC text format
+        sCI.convert_AMOLQC(
+            f"{wavefunction_name}.wf",
+            f"{wavefunction_name}_out.wf",
+            N,
+            binary=False,
+        )
+
     if data["Output"]["plotCICoefficients"]:
         if data["Output"]["plotly"]:
             evaluation.plot_ci_coefficients_plotly(wavefunction_name, N, n_MO)
@@ -1,10 +1,32 @@
 
+import json
+import os
+import tempfile
 import numpy as np
+from collections import OrderedDict
 
 class SpinCoupling():
     """generate configuration state function"""
-    def __init__(self):
-        pass
+    def __init__(self, cache_size=64):
+        # least recently used csfs keyed by (N, S, M_s)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_file = ""
+        # keys of csfs stored in the cache file and csfs that still have to
+        # be stored, which are written in batches of save_size
+        self.saved_keys = set()
+        self.unsaved = {}
+        self.save_size = 16
+        # Clebsch Gordan factors keyed by number of electrons
+        self.cg_tables = {}
+
+    def __getstate__(self):
+        """copies of worker processes do not write the cache file, it is
+        only written by the process that loaded it"""
+        state = self.__dict__.copy()
+        state["cache_file"] = ""
+        state["unsaved"] = {}
+        return state
 
     def sign(self,num):
         return -1 if num < 0 else (1 if num > 0 else 1)
@@ -23,6 +45,31 @@ class SpinCoupling():
         sub(l)
         return res
     
+    def get_unique_permutations(self, x, step_forbidden=None):
+        """compute all distinct permutations of x in the order of their first
+        occurrence in get_permutations. Each value is only swapped once to
+        each position, such that no duplicates are generated. Permutations
+        with a partial sum for which step_forbidden is true are skipped."""
+        x = list(x)
+        n = len(x)
+        def sub(i, partial):
+            if i == n:
+                res.append(x[:])
+                return
+            used = set()
+            for k in range(i, n):
+                if x[k] in used:
+                    continue
+                used.add(x[k])
+                if step_forbidden and step_forbidden(partial + x[k]):
+                    continue
+                x[i], x[k] = x[k], x[i]
+                sub(i + 1, partial + x[i])
+                x[i], x[k] = x[k], x[i]
+        res = []
+        sub(0, 0)
+        return res
+
     def remove_duplicates(self,x):
         """remove duplicate entries from list"""
         res = []
@@ -109,6 +156,61 @@ class SpinCoupling():
             ref_uncoupled = uncoupled_ms[i]
         return prod
     
+    def get_cg_table(self, N):
+        """table of Clebsch Gordan factors C_plus and C_minus of shape
+        (2, 2, 2N+1, 2N+1) indexed by coupled step, uncoupled step, 2S+N and
+        2M+N. Factors that cannot be computed are nan."""
+        if N in self.cg_tables:
+            return self.cg_tables[N]
+        table = np.full((2, 2, 2 * N + 1, 2 * N + 1), np.nan)
+        for t, C in enumerate((self.C_minus, self.C_plus)):
+            for i_sgm, sgm in enumerate((-.5, .5)):
+                for s2 in range(2 * N + 1):
+                    for m2 in range(2 * N + 1):
+                        try:
+                            table[t, i_sgm, s2, m2] = C(
+                                (s2 - N) * .5, (m2 - N) * .5, sgm
+                            )
+                        except (ZeroDivisionError, AssertionError):
+                            pass
+        self.cg_tables[N] = table
+        return table
+
+    def get_coupling_coefficients(self, primitives, paths, block_size=2**22):
+        """compute contribution of all primitive spin functions to all csfs
+        given by genealogical paths. Returns matrix of shape
+        (n_paths, n_primitives) which equals proj_prim_spin for each pair."""
+        primitives = np.array(primitives, dtype=np.int64).reshape(
+            len(primitives), -1
+        )
+        paths = np.array(paths, dtype=np.int64).reshape(len(paths), -1)
+        N = paths.shape[1]
+        n_s = 2 * N + 1
+        table = self.get_cg_table(N).ravel()
+        # cumulative S of paths and M of primitives shifted to table indices
+        idx_paths = (paths > 0) * (2 * n_s * n_s) + (
+            np.cumsum(paths, axis=1) + N
+        ) * n_s
+        idx_primitives = (primitives > 0) * (n_s * n_s) + (
+            np.cumsum(primitives, axis=1) + N
+        )
+        res = np.empty((len(paths), len(primitives)))
+        n_block = max(1, block_size // max(1, len(primitives)))
+        for start in range(0, len(paths), n_block):
+            block = slice(start, start + n_block)
+            # multiply in the same order as proj_prim_spin for identical
+            # floating point results
+            prod = np.ones((len(paths[block]), len(primitives)))
+            for i in range(N):
+                prod *= table[
+                    idx_paths[block, i, None] + idx_primitives[None, :, i]
+                ]
+            res[block] = prod
+        assert not np.isnan(
+            res
+        ).any(), "Clebsch Gordan Coefficient cannot be computed."
+        return res
+
     def print_csfs(self, path, primitives, coeffs):
         """print csf output as linearcombinations of primitive spin functions"""
         for i, func in enumerate(path):
@@ -131,9 +233,82 @@ class SpinCoupling():
                 print()
         print()
 
+    def read_cache_file(self):
+        """return entries of cache file"""
+        if not os.path.isfile(self.cache_file):
+            return []
+        with open(self.cache_file, "r") as reffile:
+            return json.load(reffile)
+
+    def load_cache(self, cache_file):
+        """warm cache with csfs stored in cache file. Newly computed csfs
+        are added to the cache file by save_cache."""
+        self.cache_file = os.path.abspath(cache_file)
+        entries = self.read_cache_file()
+        self.saved_keys = {
+            (entry["N"], entry["S"], entry["M_s"]) for entry in entries
+        }
+        for entry in entries[-self.cache_size:]:
+            key = (entry["N"], entry["S"], entry["M_s"])
+            self.cache[key] = (
+                entry["paths"], entry["primitives"], entry["coefficients"]
+            )
+
+    def save_cache(self):
+        """add computed csfs, which are not yet stored, to cache file"""
+        if not self.cache_file or not self.unsaved:
+            return
+        entries = self.read_cache_file()
+        self.saved_keys |= {
+            (entry["N"], entry["S"], entry["M_s"]) for entry in entries
+        }
+        for key, (paths, primitives, coefficients) in self.unsaved.items():
+            if key in self.saved_keys:
+                continue
+            entries.append({
+                "N": key[0],
+                "S": key[1],
+                "M_s": key[2],
+                "paths": paths,
+                "primitives": primitives,
+                "coefficients": [
+                    [float(c) for c in coeffs] for coeffs in coefficients
+                ],
+            })
+            self.saved_keys.add(key)
+        self.unsaved = {}
+        # write to unique temporary file first, such that an interrupted run
+        # does not leave a corrupted cache file
+        fd, tmp_file = tempfile.mkstemp(
+            suffix=".tmp", dir=os.path.dirname(self.cache_file)
+        )
+        with os.fdopen(fd, "w") as reffile:
+            json.dump(entries, reffile)
+        os.replace(tmp_file, self.cache_file)
+
+    def get_csfs(self, N, S, M_s):
+        """return all csfs for a certain S state. csfs are only computed once
+        for each (N, S, M_s) and are afterwards taken from the cache. Lists
+        of coefficients are copied, since they are modified by the caller."""
+        key = (N, S, M_s)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+        else:
+            self.cache[key] = self.get_all_csfs(N, S, M_s)
+            if self.cache_file and key not in self.saved_keys:
+                self.unsaved[key] = self.cache[key]
+                if len(self.unsaved) >= self.save_size:
+                    self.save_cache()
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        paths, primitives, coefficients = self.cache[key]
+        return paths, primitives, [list(coeffs) for coeffs in coefficients]
+
     def get_all_csfs(self, N, S, M_s):
         """return all csfs for a certain S state"""
         # TODO check if input is allowed
+        if M_s < 0:
+            raise ValueError("csfs can only be generated for M_s >= 0")
 
         # generate list of involved spins represented by 1 and -1
         spins = []
@@ -147,21 +322,26 @@ class SpinCoupling():
             spins.append(-1)
         assert len(spins) == N, "input state does not exist"
 
-        # get path according to geneological scheme
-        perms = self.get_permutations(spins,0,len(spins))
-        unique_perms = self.remove_duplicates(perms)
-        paths = self.check_geneological(unique_perms,major_spin)
-        # get all primitive spin functions 
-        spin_basis = [unique_perms]
+        # get path according to geneological scheme. Paths are enumerated
+        # directly, steps that are forbidden in the branching diagram are
+        # not followed.
+        def step_forbidden(S):
+            return S * major_spin < 0
+
+        paths = self.get_unique_permutations(spins, step_forbidden)
+        # get all primitive spin functions, only primitive spin functions
+        # with the requested M_s contribute to the csfs
+        spin_basis = []
+        if sum(spins) * .5 == M_s:
+            spin_basis.append(self.get_unique_permutations(spins))
 
         # get also primitive spin function basis from lower S
         for i, spin in enumerate(spins):
             if spin==1:
                 spins[i] = -1
             if sum(spins)>=0:
-                perms = self.get_permutations(spins,0,len(spins))
-                unique_perms = self.remove_duplicates(perms)
-                spin_basis.append(unique_perms)
+                if sum(spins) * .5 == M_s:
+                    spin_basis.append(self.get_unique_permutations(spins))
             else:
                 break
 
@@ -173,24 +353,15 @@ class SpinCoupling():
         csf_paths = []
         for primitive_spin in spin_basis:
             #print(f"spinbasis: {primitive_spin[0]}")
-            for path in paths:
-                coeff_tmp = []
-                primitives_tmp = []
-                for primitive in primitive_spin:
-                    coeff = self.proj_prim_spin(primitive, path)
-                    # append coefficients and spin functions if coefficient not 0  
-                    if coeff:
-                        coeff_tmp.append(coeff)
-                        primitives_tmp.append(primitive)
-                if sum(primitive)* .5 == M_s:
-                    return_csf = True
-                else:
-                    return_csf = False
-                # add only to return list, if M_s corresponds to input 
-                if return_csf:
-                    csf_paths.append(path)
-                    csf_coefficients.append(coeff_tmp)
-                    csf_primitives.append(primitives_tmp)
+            coeffs = self.get_coupling_coefficients(primitive_spin, paths)
+            for path, coeffs_path in zip(paths, coeffs):
+                # append coefficients and spin functions if coefficient not 0
+                nonzero = np.flatnonzero(coeffs_path)
+                coeff_tmp = list(coeffs_path[nonzero])
+                primitives_tmp = [primitive_spin[j] for j in nonzero]
+                csf_paths.append(path)
+                csf_coefficients.append(coeff_tmp)
+                csf_primitives.append(primitives_tmp)
 
         return csf_paths, csf_primitives, csf_coefficients
     
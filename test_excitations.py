@@ -1,5 +1,14 @@
 # import pytest
+import itertools
+import json
+import math
+import os
+import pickle
+import tempfile
 from csf import SelectedCI
+from charactertables import CharacterTable
+from csfwavefunction import CSFWavefunction
+from amoscanner import AmoScanner
 import numpy as np
 
 # from my_csf import *
@@ -698,6 +707,1038 @@ def n_tuple_excitations_frozen_core(
     ), "test for n-tuple excitation with frozen core without symmetry failed"
 
 
+def bitstring_conversion(determinants, n_orbitals):
+    """convert determinants to packed alpha/beta bitstrings and back."""
+    array = sCI.bitstrings.dets2array(determinants, n_orbitals)
+    assert array.shape == (
+        len(determinants),
+        2,
+        sCI.bitstrings.n_words(n_orbitals),
+    ), "bitstring array of determinants has wrong shape."
+    converted = sCI.bitstrings.array2dets(array, order="amolqc")
+    assert (
+        converted == determinants
+    ), "conversion of determinants to bitstrings and back failed."
+    converted = sCI.bitstrings.array2dets(array)
+    assert converted == [
+        sorted(det, key=sCI.custom_sort) for det in determinants
+    ], "conversion of bitstrings to custom sorted determinants failed."
+
+
+def excitation_degrees(determinants, reference_determinant):
+    """determine excitation degrees of determinants with popcount of the
+    bitstrings and compare with counting of electrons not in reference."""
+    ref_degrees = [
+        sum(electron not in reference_determinant for electron in det)
+        for det in determinants
+    ]
+    degrees = sCI.determine_excitations(
+        determinants, reference_determinant, "det"
+    )
+    assert (
+        degrees == ref_degrees
+    ), "determination of excitation degrees with bitstrings failed."
+
+
+def n_tuple_excitations_in_chunks(
+    number_of_MOs, excitations_to_perform, determinant, chunk_size
+):
+    """generate excitations lazily in chunks and compare with the list of
+    all excitations."""
+    ref_excitations = sCI.get_excitations(
+        number_of_MOs, excitations_to_perform, determinant
+    )
+    chunks = list(
+        sCI.iter_excitations(
+            number_of_MOs,
+            excitations_to_perform,
+            determinant,
+            chunk_size=chunk_size,
+        )
+    )
+    assert all(
+        len(chunk) == chunk_size for chunk in chunks[:-1]
+    ), "lazy generation of excitations yields chunks of wrong size."
+    excitations = [det for chunk in chunks for det in chunk]
+    assert (
+        excitations == ref_excitations
+    ), "lazy generation of excitations in chunks failed."
+
+
+def n_tuple_excitations_pruned_symmetry(
+    number_of_MOs,
+    excitations_to_perform,
+    determinant,
+    orbital_symmetry,
+    point_group,
+    chunk_size,
+):
+    """enumerate only symmetry conserving virtual tuples in chunks and
+    compare with filtering all excitations by symmetry."""
+    target = sCI.get_determinant_symmetry(
+        determinant, orbital_symmetry, point_group
+    )
+    ref_excitations = [
+        det
+        for det in sCI.get_excitations(
+            number_of_MOs, excitations_to_perform, determinant
+        )
+        if sCI.get_determinant_symmetry(det, orbital_symmetry, point_group)
+        == target
+    ]
+    chunks = sCI.iter_excitations(
+        number_of_MOs,
+        excitations_to_perform,
+        determinant,
+        orbital_symmetry=orbital_symmetry,
+        tot_sym=point_group,
+        chunk_size=chunk_size,
+    )
+    excitations = [det for chunk in chunks for det in chunk]
+    assert (
+        excitations == ref_excitations
+    ), "pruned excitations in chunks failed."
+    assert excitations == sCI.get_excitations(
+        number_of_MOs,
+        excitations_to_perform,
+        determinant,
+        orbital_symmetry=orbital_symmetry,
+        tot_sym=point_group,
+    ), "pruned excitations of generator and list differ."
+
+
+def n_tuple_excitations_spin_separated(
+    number_of_MOs, excitations_to_perform, determinant
+):
+    """enumerate virtual tuples separately for alpha and beta electrons and
+    compare with filtering all combinations of holes and virtual orbitals
+    by spin and order."""
+    occupied = sorted(determinant)
+    virtuals = [
+        i
+        for i in range(-number_of_MOs, number_of_MOs + 1)
+        if i != 0 and i not in determinant
+    ]
+    alpha_ini, beta_ini = sCI.bitstrings.det2bits(determinant)
+    ref_excitations = []
+    for excitation in excitations_to_perform:
+        for holes in itertools.combinations(occupied, excitation):
+            for particles in itertools.combinations(virtuals, excitation):
+                if not all(
+                    i * a > 0 and abs(i) < abs(a)
+                    for i, a in zip(holes, particles)
+                ):
+                    continue
+                alpha = alpha_ini
+                beta = beta_ini
+                for i, a in zip(holes, particles):
+                    if i > 0:
+                        alpha ^= (1 << (i - 1)) | (1 << (a - 1))
+                    else:
+                        beta ^= (1 << (-i - 1)) | (1 << (-a - 1))
+                ref_excitations.append(sCI.bitstrings.bits2det(alpha, beta))
+    excitations = sCI.get_excitations(
+        number_of_MOs, excitations_to_perform, determinant
+    )
+    assert (
+        excitations == ref_excitations
+    ), "spin separated enumeration of excitations failed."
+
+
+def determinant_symmetries(determinants, orbital_symmetry, point_group):
+    """determine symmetry of determinants batched with xor encoded irreps
+    and compare with multiplication of characters."""
+    symmetry = CharacterTable(point_group)
+    ref_symmetries = []
+    for det in determinants:
+        prod = symmetry.characters[orbital_symmetry[abs(det[0]) - 1]]
+        for electron in det[1:]:
+            prod = symmetry.multiply(
+                prod, symmetry.characters[orbital_symmetry[abs(electron) - 1]]
+            )
+        ref_symmetries.append(symmetry.character2label(prod))
+    symmetries = [
+        sCI.get_determinant_symmetry(det, orbital_symmetry, point_group)
+        for det in determinants
+    ]
+    assert (
+        symmetries == ref_symmetries
+    ), "determination of determinant symmetry with xor encoded irreps failed."
+    codes = sCI.get_determinants_symmetry(
+        determinants, orbital_symmetry, point_group
+    )
+    symmetries = [symmetry.int2irrep(code) for code in codes]
+    assert (
+        symmetries == ref_symmetries
+    ), "batched determination of determinant symmetry failed."
+
+
+def n_tuple_excitations_degenerate_symmetry(
+    number_of_MOs, excitations_to_perform, determinant, orbital_symmetry
+):
+    """excite determinant in d4h with degenerate irreps. All excited
+    determinants have to contain the totally symmetric irrep."""
+    symmetry = CharacterTable("d4h")
+    assert symmetry.get_product_table()[("Eg", "Eu")] == [
+        "A1u",
+        "A2u",
+        "B1u",
+        "B2u",
+    ], "reduction of direct product of degenerate irreps failed."
+    excitations = sCI.get_excitations(
+        number_of_MOs,
+        excitations_to_perform,
+        determinant,
+        orbital_symmetry=orbital_symmetry,
+        tot_sym="d4h",
+    )
+    irreps = sCI.get_determinants_irreps(excitations, orbital_symmetry, "d4h")
+    assert irreps.tolist() == [
+        sCI.get_determinant_irreps(det, orbital_symmetry, "d4h")
+        for det in excitations
+    ], "batched screening of determinants with degenerate irreps failed."
+    assert all(
+        "A1g" in symmetry.mask2labels(mask) for mask in irreps
+    ), "excitations with degenerate irreps do not contain target irrep."
+    assert (
+        [1, -1, 2, 3, -3, 5, -5, -6] in excitations
+    ), "symmetry allowed excitation with degenerate irreps is missing."
+    assert (
+        [1, -1, 2, -2, 3, -3, 5, -6] not in excitations
+    ), "symmetry forbidden excitation with degenerate irreps is kept."
+    assert (
+        sCI.get_determinant_symmetry([1, -1, 4], orbital_symmetry, "d4h")
+        == "Eu"
+    ), "symmetry of determinant with degenerate irrep failed."
+    assert (
+        sCI.get_determinant_symmetry([1, 4, -5], orbital_symmetry, "d4h")
+        is None
+    ), "symmetry of reducible determinant is not None."
+    # the direct product of Eu and Eg does not contain the totally
+    # symmetric irrep, such that the state symmetry has to be given
+    determinant = [1, -1, 2, -2, 3, -3, 4, 7]
+    try:
+        sCI.get_target_irrep(determinant, orbital_symmetry, "d4h")
+    except AssertionError:
+        pass
+    else:
+        assert False, "target irrep of reducible determinant is guessed."
+    sCI.state_symmetry = "A2u"
+    assert symmetry.mask2labels(
+        sCI.get_target_irrep(determinant, orbital_symmetry, "d4h")
+    ) == ["A2u"], "target irrep of state symmetry failed."
+    ref_excitations = [
+        det
+        for det in sCI.get_excitations(
+            number_of_MOs, excitations_to_perform, determinant
+        )
+        if "A2u"
+        in symmetry.mask2labels(
+            sCI.get_determinant_irreps(det, orbital_symmetry, "d4h")
+        )
+    ]
+    excitations = sCI.get_excitations(
+        number_of_MOs,
+        excitations_to_perform,
+        determinant,
+        orbital_symmetry=orbital_symmetry,
+        tot_sym="d4h",
+    )
+    sCI.state_symmetry = ""
+    assert (
+        excitations == ref_excitations
+    ), "excitations of state symmetry with degenerate irreps failed."
+
+
+def n_tuple_excitations_one_dimensional_symmetry(
+    number_of_MOs, excitations_to_perform, determinant, orbital_symmetry
+):
+    """excite determinant in d4h with only one-dimensional orbital irreps,
+    for which the virtual orbitals are pruned by xor encoded irreps, and
+    compare with filtering all excitations by symmetry."""
+    target = sCI.get_determinant_symmetry(
+        determinant, orbital_symmetry, "d4h"
+    )
+    ref_excitations = [
+        det
+        for det in sCI.get_excitations(
+            number_of_MOs, excitations_to_perform, determinant
+        )
+        if sCI.get_determinant_symmetry(det, orbital_symmetry, "d4h")
+        == target
+    ]
+    excitations = sCI.get_excitations(
+        number_of_MOs,
+        excitations_to_perform,
+        determinant,
+        orbital_symmetry=orbital_symmetry,
+        tot_sym="d4h",
+    )
+    assert (
+        excitations == ref_excitations
+    ), "pruned excitations with one-dimensional irreps in d4h failed."
+    configurations = sCI.iter_configurations(
+        number_of_MOs,
+        excitations_to_perform,
+        determinant,
+        orbital_symmetry=orbital_symmetry,
+        tot_sym="d4h",
+    )
+    assert set(configurations) == set(
+        sCI.get_unique_configurations(ref_excitations)
+    ), "screened configurations with one-dimensional irreps in d4h failed."
+
+
+def excitations_of_determinants(
+    number_of_MOs, excitations_to_perform, determinants
+):
+    """excite chunk of determinants as done by each worker. Duplicates have
+    to be removed in order of first occurrence."""
+    excitations = sCI.excite_determinants(
+        determinants,
+        number_of_MOs,
+        excitations_to_perform,
+        determinants[0],
+        [],
+        "",
+        [],
+        [],
+    )
+    reference = []
+    for det in determinants:
+        for det_excited in sCI.get_excitations(
+            number_of_MOs,
+            excitations_to_perform,
+            det,
+            det_reference=determinants[0],
+        ):
+            if det_excited not in reference:
+                reference.append(det_excited)
+    assert (
+        excitations == reference
+    ), "excitations of chunk of determinants failed."
+    # chunks are excited separately as done by each worker, duplicates
+    # across chunks are removed while merging in order
+    chunks = [
+        sCI.excite_determinants(
+            determinants,
+            number_of_MOs,
+            excitations_to_perform,
+            determinants[0],
+            [],
+            "",
+            [],
+            [],
+            start,
+            start + 1,
+        )
+        for start in range(len(determinants))
+    ]
+    assert (
+        sCI.bitstrings.remove_duplicates(itertools.chain.from_iterable(chunks))
+        == reference
+    ), "merged excitations of chunks of determinants failed."
+
+
+def cached_csfs(determinants, S, M_s):
+    """csfs from cached and stored spin couplings have to equal freshly
+    computed csfs"""
+    csf_coefficients, csfs = SelectedCI().get_unique_csfs(determinants, S, M_s)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_file = os.path.join(tmp_dir, "spin_couplings.json")
+        sCI_cached = SelectedCI()
+        sCI_cached.spinfuncs.load_cache(cache_file)
+        for _ in range(2):
+            assert sCI_cached.get_unique_csfs(determinants, S, M_s) == (
+                csf_coefficients,
+                csfs,
+            ), "csfs from cached spin couplings failed."
+        sCI_loaded = SelectedCI()
+        sCI_loaded.spinfuncs.load_cache(cache_file)
+        assert sCI_loaded.spinfuncs.cache, "loading of spin couplings failed."
+        assert sCI_loaded.get_unique_csfs(determinants, S, M_s) == (
+            csf_coefficients,
+            csfs,
+        ), "csfs from stored spin couplings failed."
+        # couplings that are recomputed after eviction from the cache are
+        # not stored again
+        sCI_evicting = SelectedCI()
+        sCI_evicting.spinfuncs.cache_size = 1
+        sCI_evicting.spinfuncs.load_cache(cache_file)
+        for _ in range(2):
+            sCI_evicting.get_unique_csfs(determinants, S, M_s)
+        with open(cache_file, "r") as reffile:
+            keys = [
+                (entry["N"], entry["S"], entry["M_s"])
+                for entry in json.load(reffile)
+            ]
+        assert len(keys) == len(set(keys)), "spin couplings stored twice."
+        # only the parent process writes the cache file of a process pool
+        pool_file = os.path.join(tmp_dir, "spin_couplings_pool.json")
+        sCI_pool = SelectedCI()
+        sCI_pool.spinfuncs.load_cache(pool_file)
+        assert not pickle.loads(
+            pickle.dumps(sCI_pool.spinfuncs)
+        ).cache_file, "copy of spin couplings writes cache file."
+        configurations = sCI_pool.get_unique_configurations(determinants)
+        assert sCI_pool.get_sorted_csfs(
+            configurations, S, M_s, workers=2
+        ) == sCI.get_sorted_csfs(
+            configurations, S, M_s
+        ), "csfs of process pool with cache file failed."
+        with open(pool_file, "r") as reffile:
+            assert len(json.load(reffile)) == len(
+                {singly.bit_count() for _, singly in configurations} - {0}
+            ), "spin couplings of process pool are not stored."
+        assert not [
+            name for name in os.listdir(tmp_dir) if name.endswith(".tmp")
+        ], "temporary cache file is left."
+
+
+def genealogical_paths(n_open):
+    """enumerate primitive spin functions and genealogical paths of n_open
+    singulett coupled electrons without duplicates"""
+    spins = [1, -1] * (n_open // 2)
+    primitives = sCI.spinfuncs.get_unique_permutations(spins)
+    paths = sCI.spinfuncs.get_unique_permutations(spins, lambda S: S < 0)
+    assert len(primitives) == len(
+        {tuple(primitive) for primitive in primitives}
+    ) and len(primitives) == math.comb(
+        n_open, n_open // 2
+    ), "enumeration of primitive spin functions failed."
+    assert len(paths) == math.comb(n_open, n_open // 2) // (
+        n_open // 2 + 1
+    ), "enumeration of genealogical paths failed."
+    assert all(
+        min(np.cumsum(path)) >= 0 for path in paths
+    ), "genealogical path with negative spin."
+    try:
+        sCI.spinfuncs.get_all_csfs(n_open, 0, -1)
+    except ValueError:
+        pass
+    else:
+        assert False, "csfs with negative M_s are not rejected."
+
+
+def coupling_coefficients(n_open, S):
+    """batched Clebsch Gordan projection has to equal projection of each
+    primitive spin function on each genealogical path"""
+    spins = [1] * int(2 * S) + [1, -1] * int((n_open - 2 * S) // 2)
+    primitives = sCI.spinfuncs.get_unique_permutations(spins)
+    paths = sCI.spinfuncs.get_unique_permutations(spins, lambda S: S < 0)
+    coefficients = sCI.spinfuncs.get_coupling_coefficients(primitives, paths)
+    assert coefficients.tolist() == [
+        [
+            sCI.spinfuncs.proj_prim_spin(primitive, path)
+            for primitive in primitives
+        ]
+        for path in paths
+    ], "batched projection of primitive spin functions failed."
+
+
+def csr_wavefunction(determinants, S, M_s):
+    """csfs in csr format have to equal nested lists and have to be written
+    and read identically"""
+    csf_coefficients, csfs = sCI.get_unique_csfs(determinants, S, M_s)
+    csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
+        csf_coefficients, csfs
+    )
+    CI_coefficients = [1 if n == 0 else 0 for n in range(len(csfs))]
+    wavefunction = CSFWavefunction().from_lists(
+        csf_coefficients, csfs, CI_coefficients
+    )
+    assert wavefunction.to_lists() == (
+        csf_coefficients,
+        csfs,
+        CI_coefficients,
+    ), "conversion of csfs in csr format failed."
+    assert len(wavefunction.determinants) == len(
+        {tuple(det) for csf in csfs for det in csf}
+    ), "determinants in csr format are not unique."
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_lists = os.path.join(tmp_dir, "lists.wf")
+        file_csr = os.path.join(tmp_dir, "csr.wf")
+        sCI.write_AMOLQC(
+            csf_coefficients, csfs, CI_coefficients, file_name=file_lists
+        )
+        sCI.write_AMOLQC(
+            [], [], [], file_name=file_csr, wavefunction=wavefunction
+        )
+        with open(file_lists, "r") as f_lists, open(file_csr, "r") as f_csr:
+            assert (
+                f_lists.read() == f_csr.read()
+            ), "writing of csfs in csr format failed."
+        wavefunction, _ = sCI.read_AMOLQC_csfs(
+            file_csr, len(determinants[0]), csr=True
+        )
+        assert (
+            wavefunction.to_lists()
+            == sCI.read_AMOLQC_csfs(file_lists, len(determinants[0]))[:3]
+        ), "reading of csfs in csr format failed."
+
+
+def configuration_excitations(
+    number_of_MOs, excitations_to_perform, determinant, **kwargs
+):
+    """excitations of spatial configurations have to equal configurations
+    of excited determinants"""
+    configurations = list(
+        sCI.iter_configurations(
+            number_of_MOs, excitations_to_perform, determinant, **kwargs
+        )
+    )
+    reference = sCI.get_unique_configurations(
+        sCI.iter_excitations(
+            number_of_MOs, excitations_to_perform, determinant, **kwargs
+        )
+    )
+    assert len(configurations) == len(
+        set(configurations)
+    ), "configurations are generated more than once."
+    assert set(configurations) == set(
+        reference
+    ), "excitation of configurations failed."
+
+
+def csfs_of_configuration_chunks(determinants, S, M_s, chunk_size):
+    """csfs of chunks of closed and open shell configurations have to be
+    equal to the csfs of all configurations, when concatenated in order"""
+    csf_coefficients, csfs = sCI.get_unique_csfs(determinants, S, M_s)
+    csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
+        csf_coefficients, csfs
+    )
+    configurations = sCI.get_unique_configurations(determinants)
+    assert sCI.get_sorted_csfs(configurations, S, M_s) == (
+        csf_coefficients,
+        csfs,
+    ), "construction of sorted csfs failed."
+    chunk_coefficients = []
+    chunk_csfs = []
+    for is_open in (False, True):
+        configurations_shell = [
+            configuration
+            for configuration in configurations
+            if bool(configuration[1]) == is_open
+        ]
+        for start in range(0, len(configurations_shell), chunk_size):
+            coefficients_tmp, csfs_tmp = sCI.get_sorted_csfs(
+                configurations_shell[start : start + chunk_size], S, M_s
+            )
+            chunk_coefficients += coefficients_tmp
+            chunk_csfs += csfs_tmp
+    assert chunk_coefficients == csf_coefficients, "order of chunks failed."
+    assert chunk_csfs == csfs, "order of chunks failed."
+
+
+def batched_determinant_sorting():
+    """batched sorting of determinants in AMOLQC format has to give the
+    sorted determinants and the parity of the permutations"""
+    determinants, is_odd = sCI.sort_determinants(
+        [[1, -1, 2, -2], [-3, 2, -1, 1], [4, 3, -2, -1], [1, 2, -1, -2]]
+    )
+    assert determinants.tolist() == [
+        [1, 2, -1, -2],
+        [1, 2, -1, -3],
+        [3, 4, -1, -2],
+        [1, 2, -1, -2],
+    ], "batched sorting of determinants failed."
+    assert is_odd.tolist() == [
+        True,
+        True,
+        False,
+        False,
+    ], "parity of sorted determinants failed."
+    csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
+        [[0.5, 0.5], [1.0]], [[[2, 1, -1], [1, -2, 2]], [[-1, 1, 2, 3, -2]]]
+    )
+    assert csf_coefficients == [
+        [-0.5, -0.5],
+        [-1.0],
+    ], "sorting of determinants with different length failed."
+    assert csfs == [
+        [[1, 2, -1], [1, 2, -2]],
+        [[1, 2, 3, -1, -2]],
+    ], "sorting of determinants with different length failed."
+
+
+def visited_configurations(determinants, n_orbitals):
+    """visited configurations have to be written and read identically and
+    are only valid for the file of discarded csfs they belong to"""
+    csf_coefficients, csfs = sCI.get_unique_csfs(determinants, 0, 0)
+    configurations = sCI.get_csf_configurations(csfs)
+    assert configurations == set(
+        sCI.get_unique_configurations(determinants)
+    ), "configurations of csfs failed."
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename_discarded = os.path.join(tmp_dir, "wf_dis.wf")
+        filename = os.path.join(tmp_dir, "wf_dis_visited.npz")
+        assert (
+            sCI.get_file_stamp(filename_discarded, len(csfs)) is None
+        ), "stamp of missing file failed."
+        sCI.write_AMOLQC(
+            csf_coefficients,
+            csfs,
+            [0.0] * len(csfs),
+            file_name=filename_discarded,
+        )
+        discarded_stamp = sCI.get_file_stamp(filename_discarded, len(csfs))
+        sCI.write_visited_configurations(
+            filename, configurations, discarded_stamp, n_orbitals
+        )
+        assert (
+            sCI.read_visited_configurations(filename, discarded_stamp)
+            == configurations
+        ), "reading of visited configurations failed."
+        # the file of discarded csfs changes with the next selection
+        sCI.write_AMOLQC(
+            csf_coefficients[1:],
+            csfs[1:],
+            [0.0] * (len(csfs) - 1),
+            file_name=filename_discarded,
+        )
+        assert (
+            sCI.read_visited_configurations(
+                filename,
+                sCI.get_file_stamp(filename_discarded, len(csfs) - 1),
+            )
+            is None
+        ), "visited configurations of different discarded csfs are used."
+    assert (
+        sCI.read_visited_configurations(filename, discarded_stamp) is None
+    ), "missing file of visited configurations is not detected."
+
+
+def streamed_wavefunction(determinants, S, M_s):
+    """wave functions written from iterators in chunks have to equal wave
+    functions written from lists"""
+    csf_coefficients, csfs = sCI.get_unique_csfs(determinants, S, M_s)
+    csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
+        csf_coefficients, csfs
+    )
+    CI_coefficients = [1 if n == 0 else 0 for n in range(len(csfs))]
+    energies = [-0.001 * n for n in range(len(csfs))]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_lists = os.path.join(tmp_dir, "lists.wf")
+        file_stream = os.path.join(tmp_dir, "stream.wf")
+        for wftype, representation in (
+            ("csf", csfs),
+            ("det", [csf[0] for csf in csfs]),
+        ):
+            sCI.write_AMOLQC(
+                csf_coefficients,
+                representation,
+                CI_coefficients,
+                pretext="$general\n$end\n",
+                energies=energies,
+                file_name=file_lists,
+                wftype=wftype,
+            )
+            sCI.write_AMOLQC(
+                iter(csf_coefficients),
+                iter(representation),
+                iter(CI_coefficients),
+                pretext="$general\n$end\n",
+                energies=iter(energies),
+                file_name=file_stream,
+                wftype=wftype,
+                chunk_size=3,
+            )
+            with open(file_lists, "r") as f_lists:
+                with open(file_stream, "r") as f_stream:
+                    assert (
+                        f_lists.read() == f_stream.read()
+                    ), "streamed writing of wave function failed."
+
+
+def bulk_parsing():
+    """bulk parsing of wave functions in AMOLQC format has to return the
+    csfs and determinants of the file"""
+    text = b"""$general
+ title=test
+$end
+$csfs
+      2
+ 1.000000E+00       1
+  1.0000000E+00  1  2  1  3
+-2.500000E-01       2
+  7.0710678E-01  1  2  1  4
+ -7.0710678E-01  1  4  1  2
+$end
+"""
+    (
+        pretext,
+        wftype,
+        CI_coefficients,
+        n_summands,
+        coefficients,
+        determinants,
+    ) = sCI.parse_AMOLQC(text, 4)
+    assert pretext == "$general\n title=test\n$end\n", "pretext failed."
+    assert wftype == "csf", "wave function type failed."
+    assert CI_coefficients.tolist() == [1.0, -0.25], "CI coefficients failed."
+    assert n_summands.tolist() == [1, 2], "number of determinants failed."
+    assert coefficients.tolist() == [
+        1.0,
+        0.70710678,
+        -0.70710678,
+    ], "coupling coefficients failed."
+    assert determinants.tolist() == [
+        [1, 2, -1, -3],
+        [1, 2, -1, -4],
+        [1, 4, -1, -2],
+    ], "determinants failed."
+    # csfs of a single electron only consist of lines with two tokens
+    text = b"$csfs\n 2\n 1.0E+00  1\n 1.0E+00  3\n 5.0E-01  1\n 1.0E+00  2\n"
+    _, _, CI_coefficients, n_summands, _, determinants = sCI.parse_AMOLQC(
+        text, 1
+    )
+    assert CI_coefficients.tolist() == [1.0, 0.5], "CI coefficients failed."
+    assert determinants.tolist() == [[-3], [-2]], "determinants failed."
+    text = b"$dets\n 2\n 1.0E+00  1  2  1\n-2.0E-02  1  3  2\n$end\n"
+    pretext, wftype, CI_coefficients, _, _, determinants = sCI.parse_AMOLQC(
+        text, 3
+    )
+    assert pretext == "" and wftype == "det", "determinant section failed."
+    assert CI_coefficients.tolist() == [1.0, -0.02], "CI coefficients failed."
+    assert determinants.tolist() == [
+        [1, -2, -1],
+        [1, -3, -2],
+    ], "determinants failed."
+
+
+def binary_wavefunction(determinants, S, M_s):
+    """wave functions in binary format have to contain the same csfs,
+    pretext and energies as in AMOLQC text format"""
+    csf_coefficients, csfs = sCI.get_unique_csfs(determinants, S, M_s)
+    csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
+        csf_coefficients, csfs
+    )
+    n_elec = len(csfs[0][0])
+    CI_coefficients = [0.5**n for n in range(len(csfs))]
+    energies = [-0.001 * n for n in range(len(csfs))]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_text = os.path.join(tmp_dir, "text.wf")
+        file_binary = os.path.join(tmp_dir, "binary.wf")
+        file_back = os.path.join(tmp_dir, "back.wf")
+        sCI.write_AMOLQC(
+            csf_coefficients,
+            csfs,
+            CI_coefficients,
+            pretext="$general\n$end\n",
+            energies=energies,
+            file_name=file_text,
+        )
+        sCI.convert_AMOLQC(file_text, file_binary, n_elec)
+        assert CSFWavefunction().is_binary(
+            file_binary
+        ), "binary format failed."
+        wavefunction, pretext = sCI.read_AMOLQC_csfs(
+            file_binary, n_elec, csr=True
+        )
+        assert isinstance(
+            wavefunction.CI_coefficients, np.memmap
+        ), "memory mapping failed."
+        assert pretext == "$general\n$end\n", "pretext failed."
+        assert sCI.read_AMOLQC_csfs(file_binary, n_elec) == (
+            sCI.read_AMOLQC_csfs(file_text, n_elec)
+        ), "reading of binary format failed."
+        assert (
+            sCI.parse_csf_energies(file_binary, len(csfs))[1] == energies
+        ), "energies of binary format failed."
+        sCI.convert_AMOLQC(file_binary, file_back, n_elec, binary=False)
+        with open(file_text, "r") as f_text:
+            with open(file_back, "r") as f_back:
+                assert (
+                    f_text.read() == f_back.read()
+                ), "conversion of binary format failed."
+        # determinant wave functions
+        sCI.write_AMOLQC(
+            [],
+            [csf[0] for csf in csfs],
+            CI_coefficients,
+            file_name=file_binary,
+            wftype="det",
+            binary=True,
+        )
+        assert sCI.read_AMOLQC_csfs(file_binary, n_elec) == (
+            [],
+            [csf[0] for csf in csfs],
+            CI_coefficients,
+            "",
+        ), "determinants in binary format failed."
+
+
+def lazy_reading(determinants, S, M_s):
+    """parts of wave function files that are read lazily have to equal the
+    parts of the completely read wave function"""
+    csf_coefficients, csfs = sCI.get_unique_csfs(determinants, S, M_s)
+    csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
+        csf_coefficients, csfs
+    )
+    n_elec = len(csfs[0][0])
+    CI_coefficients = [0.5**n for n in range(len(csfs))]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, "lazy.wf")
+        for binary in (False, True):
+            sCI.write_AMOLQC(
+                csf_coefficients,
+                csfs,
+                CI_coefficients,
+                pretext="$general\n$end\n",
+                file_name=file_name,
+                binary=binary,
+            )
+            wavefunction = sCI.read_AMOLQC_csfs(file_name, n_elec)
+            wavefunction_file = sCI.open_AMOLQC(file_name, n_elec)
+            assert len(wavefunction_file) == len(csfs), "length failed."
+            assert (
+                wavefunction_file.pretext() == "$general\n$end\n"
+            ), "pretext failed."
+            assert (
+                wavefunction_file.CI_coefficients().tolist() == wavefunction[2]
+            ), "CI coefficients failed."
+            assert wavefunction_file[2:5] == tuple(
+                entries[2:5] for entries in wavefunction[:3]
+            ), "range access failed."
+            assert wavefunction_file[-1] == tuple(
+                entries[-1] for entries in wavefunction[:3]
+            ), "random access failed."
+            assert wavefunction_file[[4, 0, 3]] == tuple(
+                [entries[4], entries[0], entries[3]]
+                for entries in wavefunction[:3]
+            ), "access by list of indices failed."
+    # csfs of a single electron only consist of lines with two tokens
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, "single.wf")
+        with open(file_name, "w") as f:
+            f.write("$csfs\n 3\n 1.0E+00  1\n 1.0E+00  3\n 5.0E-01  2\n")
+            f.write(" 1.0E+00  2\n 1.0E+00  1\n-2.0E-01  1\n 1.0E+00  4\n")
+            f.write("$end\n")
+        wavefunction_file = sCI.open_AMOLQC(file_name, 1)
+        assert wavefunction_file[1:] == (
+            [[1.0, 1.0], [1.0]],
+            [[[-2], [-1]], [[-4]]],
+            [0.5, -0.2],
+        ), "lazy reading of single electrons failed."
+
+
+def compressed_wavefunction(determinants, S, M_s):
+    """compressed wave function files have to contain the same csfs and
+    energies as uncompressed files"""
+    csf_coefficients, csfs = sCI.get_unique_csfs(determinants, S, M_s)
+    csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
+        csf_coefficients, csfs
+    )
+    n_elec = len(csfs[0][0])
+    CI_coefficients = [0.5**n for n in range(len(csfs))]
+    energies = [-0.001 * n for n in range(len(csfs))]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_text = os.path.join(tmp_dir, "text.wf")
+        sCI.write_AMOLQC(
+            csf_coefficients,
+            csfs,
+            CI_coefficients,
+            pretext="$general\n$end\n",
+            energies=energies,
+            file_name=file_text,
+        )
+        wavefunction = sCI.read_AMOLQC_csfs(file_text, n_elec)
+        for file_name, compression in (
+            ("text.wf.gz", None),
+            ("text.wf.xz", None),
+            ("internal.wf", "gz"),
+        ):
+            file_name = os.path.join(tmp_dir, file_name)
+            sCI.write_AMOLQC(
+                csf_coefficients,
+                csfs,
+                CI_coefficients,
+                pretext="$general\n$end\n",
+                energies=energies,
+                file_name=file_name,
+                compression=compression,
+            )
+            assert sCI.get_compression(file_name) == (
+                compression or file_name[-2:]
+            ), "compression failed."
+            assert (
+                sCI.read_AMOLQC_csfs(file_name, n_elec) == wavefunction
+            ), "reading of compressed file failed."
+            assert (
+                sCI.parse_csf_energies(file_name, len(csfs))[1] == energies
+            ), "energies of compressed file failed."
+            wavefunction_file = sCI.open_AMOLQC(file_name, n_elec)
+            assert wavefunction_file[[3, 1]] == tuple(
+                [entries[3], entries[1]] for entries in wavefunction[:3]
+            ), "lazy reading of compressed file failed."
+            assert (
+                wavefunction_file.CI_coefficients().tolist() == wavefunction[2]
+            ), "CI coefficients of compressed file failed."
+
+
+def partitioned_writing(determinants, S, M_s):
+    """wave functions written to several files in a single pass have to
+    equal the wave functions written from slices of the lists"""
+    csf_coefficients, csfs = sCI.get_unique_csfs(determinants, S, M_s)
+    csf_coefficients, csfs = sCI.sort_determinants_in_csfs(
+        csf_coefficients, csfs
+    )
+    CI_coefficients = [(-0.5) ** n for n in range(len(csfs))]
+    energies = [-0.001 * n for n in range(len(csfs))]
+    order = sCI.get_sort_order(CI_coefficients, side=-1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_names = [
+            os.path.join(tmp_dir, f"{name}.wf")
+            for name in ("first", "second", "third")
+        ]
+        file_slice = os.path.join(tmp_dir, "slice.wf")
+
+        def same_file(file_name, csf_slice, order=range(len(csfs)), **kwargs):
+            """compare file with file written from slice of lists"""
+            indices = list(order)[csf_slice]
+            sCI.write_AMOLQC(
+                [csf_coefficients[i] for i in indices],
+                [csfs[i] for i in indices],
+                [CI_coefficients[i] for i in indices],
+                file_name=file_slice,
+                **kwargs,
+            )
+            with open(file_name, "r") as f:
+                with open(file_slice, "r") as f_slice:
+                    return f.read() == f_slice.read()
+
+        n_csfs = sCI.write_AMOLQC_partitioned(
+            csf_coefficients,
+            csfs,
+            CI_coefficients,
+            file_names,
+            split_at=[2, 5],
+            energies=energies,
+            energy_files=[2],
+            options=[{"pretext": "$general\n$end\n"}, {}, {}],
+        )
+        assert n_csfs == [2, 3, len(csfs) - 5], "number of csfs failed."
+        assert same_file(
+            file_names[0], slice(None, 2), pretext="$general\n$end\n"
+        ), "first partition failed."
+        assert same_file(
+            file_names[1], slice(2, 5)
+        ), "second partition failed."
+        assert same_file(
+            file_names[2], slice(5, None), energies=energies[5:]
+        ), "third partition with energies failed."
+        # partition depending on sort order of CI coefficients
+        sCI.write_AMOLQC_partitioned(
+            csf_coefficients,
+            csfs,
+            CI_coefficients,
+            file_names[:2],
+            split_at=[4],
+            order=order,
+        )
+        assert same_file(
+            file_names[0], slice(None, 4), order
+        ), "first sorted partition failed."
+        assert same_file(
+            file_names[1], slice(4, None), order
+        ), "second sorted partition failed."
+        # partition by sign of CI coefficients
+        sCI.write_AMOLQC_partitioned(
+            csf_coefficients,
+            csfs,
+            CI_coefficients,
+            file_names[:2],
+            partition=lambda i: int(CI_coefficients[i] < 0),
+        )
+        assert same_file(
+            file_names[0], slice(None, None, 2)
+        ), "partition of positive CI coefficients failed."
+        assert same_file(
+            file_names[1], slice(1, None, 2)
+        ), "partition of negative CI coefficients failed."
+
+
+def partial_sort_order():
+    """csfs behind the kept single excitations are sorted by their own
+    entries of the reference list, which is longer than the sorted part"""
+    ref_list = [5.0, 1.0, 0.1, -3.0, 2.0]
+    order = sCI.get_partial_sort_order(ref_list, 2, side=-1, absol=True)
+    assert order.tolist() == [0, 1, 3, 4, 2], "partial sort order failed."
+    assert sCI.get_partial_sort_order(
+        ref_list, 0, side=-1, absol=True
+    ).tolist() == sCI.get_sort_order(
+        ref_list, side=-1, absol=True
+    ).tolist(), "partial sort order of all entries failed."
+
+
+def amo_scanning():
+    """scanning of AMOLQC output has to find energies, wave functions and
+    end of the run also if the output is appended between scans"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, "run.amo")
+        with open(file_name, "w") as f:
+            f.write(" Index  Energy difference\n   2  -0.25\n   1  -0.")
+        scanner = AmoScanner()
+        assert not scanner.is_finished(file_name), "running job failed."
+        # incomplete last line is not parsed
+        assert scanner.get_energies(file_name) == (
+            [2],
+            [-0.25],
+        ), "energies of incomplete output failed."
+        with open(file_name, "a") as f:
+            f.write("5\n   3\n$end\n wave function written to run-1.wf\n")
+        offset = scanner.states[file_name]["offset"]
+        result = scanner.scan(file_name)
+        # malformed line of energies is skipped
+        assert result["energies"] == [-0.25, -0.5], "appended energies failed."
+        assert result["wavefunctions"] == [
+            "run-1.wf"
+        ], "wave functions failed."
+        assert (
+            scanner.states[file_name]["offset"] > offset
+        ), "offset of scanned output failed."
+        with open(file_name, "a") as f:
+            f.write(" Amolqc run finished\n")
+        assert scanner.is_finished(file_name), "finished job failed."
+        assert sCI.parse_csf_energies(file_name, 1) == (
+            [2],
+            [-0.25],
+        ), "parsing of energies failed."
+        # replaced output is scanned from the beginning
+        with open(file_name, "w") as f:
+            f.write(" Index  Energy difference\n   3  -0.1\n$end\n")
+        assert scanner.scan(file_name) == {
+            "status": "running",
+            "indices": [3],
+            "energies": [-0.1],
+            "wavefunctions": [],
+        }, "replaced output failed."
+        # reading stops after the requested energies and continues later
+        with open(file_name, "w") as f:
+            f.write("$nrgs\n")
+            f.writelines(f"{i}  {-i / 100}\n" for i in range(1, 101))
+            f.write("$end\n Amolqc run finished\n" + 100 * "\n")
+        scanner = AmoScanner()
+        scanner.block_size = 64
+        scanner.tail_size = 16
+        assert scanner.get_energies(file_name, 3) == (
+            [1, 2, 3],
+            [-0.01, -0.02, -0.03],
+        ), "early stop failed."
+        assert (
+            scanner.states[file_name]["offset"] == 6 + 3 * 9
+        ), "offset of early stop failed."
+        indices, energies = scanner.get_energies(file_name)
+        assert indices == list(range(1, 101)), "continued scan failed."
+        assert scanner.scan(file_name)["status"] == "finished", "end failed."
+        # finish marker in front of the end of the file across blocks
+        assert scanner.is_finished(file_name), "marker search failed."
+        scanner = AmoScanner()
+        scanner.block_size = 7
+        scanner.tail_size = 16
+        assert scanner.is_finished(file_name), "marker across blocks failed."
+
+
 # test simple n-tuple excitations
 number_of_MOs, excitations_to_perform, determinant = test_set_1()
 n_tuple_excitations(number_of_MOs, excitations_to_perform, determinant)
@@ -765,4 +1806,159 @@ n_tuple_excitations_frozen_core(
     number_of_MOs, excitations_to_perform, determinant, frozen_core_electrons
 )
 
+# test conversion of determinants with more than 64 MOs to bitstrings
+determinants = [[1, 2, 70, -1, -2, -130], [1, 64, 65, -3, -64, -65]]
+bitstring_conversion(determinants, 130)
+
+# test excitation degrees with respect to reference determinant
+number_of_MOs, excitations_to_perform, determinant = test_set_1()
+determinants = sCI.get_excitations(
+    number_of_MOs, excitations_to_perform, determinant
+)
+excitation_degrees(determinants, determinant)
+excitation_degrees([[1, 2, -1, -70], [1, 65, -2, -3]], [1, 2, -1, -2])
+
+# test lazy generation of excitations in chunks
+number_of_MOs, excitations_to_perform, determinant = test_set_1()
+n_tuple_excitations_in_chunks(
+    number_of_MOs, excitations_to_perform, determinant, 4
+)
+
+# test pruned symmetry conserving excitations in chunks
+n_tuple_excitations_pruned_symmetry(
+    8,
+    [1, 2, 3],
+    [1, -1, 2, -2, 3, -3],
+    ["A1", "B1", "B2", "A1", "A2", "B1", "B2", "A1"],
+    "c2v",
+    7,
+)
+n_tuple_excitations_pruned_symmetry(
+    8,
+    [1, 2, 3],
+    [1, -1, 2, -2, 3, 4],
+    ["Ag", "B3u", "B1g", "Au", "B2u", "Ag", "B1u", "B3g"],
+    "d2h",
+    5,
+)
+
+# test spin separated enumeration of excitations
+n_tuple_excitations_spin_separated(7, [1, 2, 3, 4], [1, -1, 2, -2, 3, -3])
+n_tuple_excitations_spin_separated(7, [1, 2, 3], [1, -1, 2, 3, -4, 5])
+
+# test batched symmetry of determinants with xor encoded irreps
+number_of_MOs, excitations_to_perform, determinant = test_set_1()
+determinants = sCI.get_excitations(
+    number_of_MOs, excitations_to_perform, determinant
+)
+determinant_symmetries(determinants, ["A1", "B1", "B2", "B1"], "c2v")
+determinant_symmetries(determinants, ["Ag", "B3u", "B1g", "Au"], "d2h")
+determinant_symmetries(determinants, ["A1g", "B1u", "B2g", "A2u"], "d4h")
+
+# test excitations with degenerate irreps in d4h
+n_tuple_excitations_degenerate_symmetry(
+    8,
+    [1, 2],
+    [1, -1, 2, -2, 3, -3, 5, -5],
+    ["A1g", "A2u", "A1g", "Eu", "Eu", "A2u", "Eg", "Eg"],
+)
+n_tuple_excitations_one_dimensional_symmetry(
+    8,
+    [1, 2],
+    [1, -1, 2, -2, 3, -3],
+    ["A1g", "A2u", "B1g", "A1g", "B2u", "A2u", "B1g", "A1u"],
+)
+
+# test excitations of chunk of determinants
+excitations_of_determinants(
+    6, [1, 2], [[1, -1, 2, -2], [1, -1, 2, -3], [1, -1, -2, 4]]
+)
+excitations_of_determinants(
+    7,
+    [1, 2, 3],
+    [
+        [1, -1, 2, -2, 3],
+        [1, -1, 2, -3, 4],
+        [1, -1, -2, 3, 5],
+        [-1, 2, -2, 3, 6],
+        [1, -2, 4, -4, 7],
+    ],
+)
+
+# test cache of spin couplings
+cached_csfs(
+    sCI.get_excitations(6, [1, 2, 3], [1, -1, 2, -2, 3, -3]), 0, 0
+)
+cached_csfs(sCI.get_excitations(6, [1, 2], [1, -1, 2, -2, 3]), 0.5, 0.5)
+
+# test enumeration of spin functions with many open shells
+genealogical_paths(14)
+
+# test batched Clebsch Gordan projection
+coupling_coefficients(6, 0)
+coupling_coefficients(7, 1.5)
+
+# test csfs in csr format
+csr_wavefunction(
+    sCI.get_excitations(6, [1, 2, 3], [1, -1, 2, -2, 3, -3]), 0, 0
+)
+
+# test excitations of configurations
+configuration_excitations(8, [1, 2, 3], [1, -1, 2, -2, 3, -3])
+configuration_excitations(
+    8,
+    [1, 2],
+    [1, -1, 2, -2, 3, -3],
+    orbital_symmetry=["A1", "B1", "B2", "A1", "A2", "B1", "B2", "A1"],
+    tot_sym="c2v",
+    core=[1, -1],
+    frozen_MOs=[8, -8],
+)
+configuration_excitations(8, [1, 2], [1, -1, 2, -2, 3, -4])
+
+# test csfs of configuration chunks
+csfs_of_configuration_chunks(
+    sCI.get_excitations(6, [1, 2, 3], [1, -1, 2, -2, 3, -3]), 0, 0, 7
+)
+
+# test batched sorting of determinants
+batched_determinant_sorting()
+
+# test visited configurations
+visited_configurations(
+    sCI.get_excitations(70, [1, 2], [1, -1, 2, -2, 3, -3]), 70
+)
+
+# test streamed writing of wave functions
+streamed_wavefunction(
+    sCI.get_excitations(6, [1, 2], [1, -1, 2, -2, 3, -3]), 0, 0
+)
+
+# test bulk parsing of wave functions
+bulk_parsing()
+
+# test binary format of wave functions
+binary_wavefunction(
+    sCI.get_excitations(6, [1, 2], [1, -1, 2, -2, 3, -3]), 0, 0
+)
+
+# test lazy reading of wave function files
+lazy_reading(sCI.get_excitations(6, [1, 2], [1, -1, 2, -2, 3, -3]), 0, 0)
+
+# test compressed wave function files
+compressed_wavefunction(
+    sCI.get_excitations(6, [1, 2], [1, -1, 2, -2, 3, -3]), 0, 0
+)
+
+# test single pass writing of partitioned wave functions
+partitioned_writing(
+    sCI.get_excitations(6, [1, 2], [1, -1, 2, -2, 3, -3]), 0, 0
+)
+
+# test sorting behind kept single excitations
+partial_sort_order()
+
+# test scanning of AMOLQC output
+amo_scanning()
+
 print("All tests passed ✅")
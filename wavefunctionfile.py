@@ -0,0 +1,94 @@
+import mmap
+import numpy as np
+from csfwavefunction import CSFWavefunction
+
+
+class WavefunctionFile:
+    """lazy reader of a wave function file in AMOLQC text or binary format.
+
+    Only the requested parts of the file are read. The header with pretext
+    and number of csfs is read on its own, csfs are read by index, slice
+    or list of indices like wf[a:b], which returns lists of coupling
+    coefficients, csfs and CI coefficients as SelectedCI.read_AMOLQC_csfs.
+    For text files, which can be compressed, the byte offsets of all csfs
+    are indexed once and cached by SelectedCI."""
+
+    def __init__(self, sCI, filename, n_elec):
+        self.sCI = sCI
+        self.filename = filename
+        self.n_elec = n_elec
+        self.header = None
+        # memory mapped wave function of binary files
+        self.wavefunction = None
+        self.binary = CSFWavefunction().is_binary(filename)
+
+    def read_header(self):
+        """pretext, wave function type and number of csfs"""
+        if self.header is None:
+            self.header = self.sCI.read_AMOLQC_header(self.filename)
+        return self.header
+
+    def pretext(self):
+        """text in front of the csfs"""
+        return self.read_header()[0]
+
+    def wftype(self):
+        """wave function type csf or det"""
+        return self.read_header()[1]
+
+    def __len__(self):
+        return self.read_header()[2]
+
+    def get_wavefunction(self):
+        """memory mapped wave function of binary file"""
+        if self.wavefunction is None:
+            self.wavefunction, _, _ = self.sCI.read_binary_wf(
+                self.filename, self.n_elec
+            )
+        return self.wavefunction
+
+    def CI_coefficients(self):
+        """array of CI coefficients of all csfs"""
+        if self.binary:
+            return np.asarray(self.get_wavefunction().CI_coefficients)
+        return self.sCI.read_AMOLQC_CI_coefficients(self.filename)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            index = range(len(self))[key]
+            csf_coefficients, csfs, CI_coefficients = self[index : index + 1]
+            if self.wftype() == "det":
+                return [], csfs[0], CI_coefficients[0]
+            return csf_coefficients[0], csfs[0], CI_coefficients[0]
+        if isinstance(key, slice):
+            indices = range(len(self))[key]
+        else:
+            indices = np.asarray(key, dtype=np.int64)
+            indices = np.arange(len(self))[indices]
+        if self.binary:
+            return self.sCI.wavefunction2lists(
+                self.get_wavefunction().get_csfs(indices), self.wftype()
+            )
+        offsets = self.sCI.get_AMOLQC_index(self.filename)
+        with self.sCI.open_AMOLQC_file(self.filename) as f:
+            if not len(indices):
+                body = b""
+            elif isinstance(indices, range) and indices.step == 1:
+                # contiguous csfs are read at once
+                f.seek(offsets[indices.start])
+                body = f.read(offsets[indices.stop] - offsets[indices.start])
+            elif self.sCI.get_compression(self.filename):
+                # compressed files can not be memory mapped
+                text = f.read()
+                body = b"\n".join(
+                    text[offsets[i] : offsets[i + 1]] for i in indices
+                )
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    body = b"\n".join(
+                        m[offsets[i] : offsets[i + 1]] for i in indices
+                    )
+        section = "$csfs" if self.wftype() == "csf" else "$dets"
+        text = f"{section}\n{len(indices)}\n".encode() + body
+        _, _, *arrays = self.sCI.parse_AMOLQC(text, self.n_elec)
+        return self.sCI.arrays2lists(self.wftype(), *arrays)